@@ -15,19 +15,80 @@
 """
 
 import sys
+import codecs
 import json
 import argparse
 import akshare as ak
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, time as dtime
 import os
+import re
 import hashlib
+import importlib.util
+import io
+import logging
+import sqlite3
+import struct
+import threading
 import time
-from typing import Dict, List, Optional, Union
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+try:
+    import xxhash  # 可选依赖：更快的非加密哈希
+    if not hasattr(xxhash, 'xxh3_64_hexdigest'):  # xxhash < 1.4 没有xxh3
+        xxhash = None
+except ImportError:
+    xxhash = None
+
+try:
+    import orjson  # 可选依赖：更快的JSON序列化
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard  # 可选依赖：缓存数据压缩
+except ImportError:
+    zstandard = None
+
+# 以下可选依赖导入较慢，模块加载时只检查是否安装，首次使用时才导入
+HAS_NUMBA = importlib.util.find_spec('numba') is not None  # 统计信息JIT编译
+HAS_PARQUET = importlib.util.find_spec('pyarrow') is not None  # 日K数据本地parquet存储
+
+try:
+    import requests  # akshare的依赖：用于给akshare的HTTP请求挂载连接池
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except ImportError:
+    requests = None
+
+logger = logging.getLogger(__name__)
 
 # 数据缓存配置
 CACHE_DIR = os.path.join(os.path.dirname(__file__), '.cache')
+DAILY_STORE_DIR = os.path.join(CACHE_DIR, 'daily')
 CACHE_EXPIRE_HOURS = 1  # 缓存过期时间（小时）
+CACHE_COMPRESS_LEVEL = 3  # 缓存数据zstd压缩级别
+CACHE_MEMORY_SIZE = 256  # 进程内缓存的最大条目数
+CACHE_PARQUET_MIN_ROWS = 200  # K线行数达到该值时缓存数据按列存为parquet
+SPOT_CACHE_SECONDS = 30  # 全市场行情快照缓存时间（秒）
+REALTIME_BATCH_CONCURRENCY = 15  # 批量实时行情的最大并发请求数
+KLINE_BATCH_WORKERS = 10  # 批量K线数据的最大并发获取数
+SUMMARY_JIT_MIN_ROWS = 250  # 约一年的交易日数，达到时统计信息使用numba内核计算
+MAX_DATE_RANGE = timedelta(days=730)  # 单次请求的最大日期跨度
+RECENT_WINDOW_DAYS = 60  # 最近行情窗口（天），窗口内的股票日K直接从本地存储截取
+HTTP_POOL_CONNECTIONS = 8  # akshare请求连接池缓存的主机数
+HTTP_POOL_MAXSIZE = 16  # 每个主机保持的最大连接数（不小于批量请求并发数）
+HTTP_RETRY_TOTAL = 2  # 服务端5xx错误时的重试次数
+
+# A股交易时段
+MORNING_START = dtime(9, 30)
+MORNING_END = dtime(11, 30)
+AFTERNOON_START = dtime(13, 0)
+AFTERNOON_END = dtime(15, 0)
 
 # 支持的指数代码映射
 INDEX_CODE_MAPPING = {
@@ -40,48 +101,435 @@ INDEX_CODE_MAPPING = {
     '000852.SH': {'name': '中证1000', 'ak_symbol': '000852'},
 }
 
-# 常用股票代码验证模式
-STOCK_CODE_PATTERNS = {
-    'A股': r'^(00[0-9]{4}|30[0-9]{4}|60[0-9]{4})$',
-    '指数_上海': r'^000[0-9]{3}\.SH$',
-    '指数_深圳': r'^399[0-9]{3}\.SZ$',
+# 指数代码到显示名称的查找表
+_INDEX_NAMES = {code: info['name'] for code, info in INDEX_CODE_MAPPING.items()}
+
+# 日K数据标准化列名映射
+_COLUMN_MAPPING = {
+    # 股票数据列名
+    '日期': 'date', 'date': 'date',
+    '开盘': 'open', 'open': 'open',
+    '收盘': 'close', 'close': 'close',
+    '最高': 'high', 'high': 'high',
+    '最低': 'low', 'low': 'low',
+    '成交量': 'volume', 'volume': 'volume',
+    '成交额': 'amount',
+    
+    # 指数数据列名
+    '开盘价': 'open',
+    '收盘价': 'close',
+    '最高价': 'high',
+    '最低价': 'low',
 }
 
+# 默认日期范围使用的日期字符串，按自然日缓存
+_DATE_CACHE = {'day': None, 'today': '', 'yesterday': '', 'month_ago': '', 'recent_start': '', 'year_ago': ''}
+
+
+def _today_strs() -> Dict:
+    """获取今天、昨天、30天前和一年前的日期字符串（YYYY-MM-DD），日期变化时才重新计算"""
+    today = date.today()
+    if _DATE_CACHE['day'] != today:
+        _DATE_CACHE.update({
+            'day': today,
+            'today': today.isoformat(),
+            'yesterday': (today - timedelta(days=1)).isoformat(),
+            'month_ago': (today - timedelta(days=30)).isoformat(),
+            'recent_start': (today - timedelta(days=RECENT_WINDOW_DAYS)).isoformat(),
+            'year_ago': (today - timedelta(days=365)).isoformat(),
+        })
+    return _DATE_CACHE
+
+
+# update_time/lastUpdate字符串，按秒缓存 [秒级时间戳, 'YYYY-MM-DD HH:MM:SS', ISO格式]
+_TS_CACHE = [0, '', '']
+
+
+def _refresh_ts_cache() -> List:
+    """同一秒内复用时间字符串，秒数变化时用一次datetime.now()重新生成"""
+    current_ts = int(time.time())
+    cached = _TS_CACHE
+    if cached[0] != current_ts:
+        now = datetime.now()
+        cached[1] = now.isoformat(sep=' ', timespec='seconds')
+        cached[2] = now.isoformat(timespec='seconds')
+        cached[0] = current_ts
+    return cached
+
+
+def _now_str() -> str:
+    """获取当前时间字符串（YYYY-MM-DD HH:MM:SS），同一秒内复用"""
+    return _refresh_ts_cache()[1]
+
+
+def _now_iso() -> str:
+    """获取当前时间的ISO格式字符串（YYYY-MM-DDTHH:MM:SS），同一秒内复用"""
+    return _refresh_ts_cache()[2]
+
+
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'  # zstd帧头
+_PARQUET_PAYLOAD_MAGIC = b'SSA\x01'  # 元数据JSON + parquet行数据
+
+
+def _encode_json(data: Dict) -> bytes:
+    """紧凑编码JSON（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _decode_json(raw: Union[bytes, str]) -> Dict:
+    """解码JSON（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _dumps_cache_payload(data: Dict) -> bytes:
+    """
+    序列化缓存数据
+    
+    K线行数较多且安装了pyarrow时，data列表按列存为zstd压缩的parquet，
+    其余字段存为JSON元数据；否则整体存为JSON（安装zstandard时压缩）。
+    """
+    rows = data.get('data')
+    if HAS_PARQUET and isinstance(rows, list) and len(rows) >= CACHE_PARQUET_MIN_ROWS:
+        try:
+            buffer = io.BytesIO()
+            pd.DataFrame.from_records(rows).to_parquet(buffer, index=False, compression='zstd')
+            meta = _encode_json({**data, 'data': None})
+            return _PARQUET_PAYLOAD_MAGIC + struct.pack('>I', len(meta)) + meta + buffer.getvalue()
+        except Exception:
+            pass  # 回退到JSON格式
+    
+    payload = _encode_json(data)
+    if zstandard is not None:
+        payload = zstandard.ZstdCompressor(level=CACHE_COMPRESS_LEVEL).compress(payload)
+    return payload
+
+
+def _loads_cache_payload(raw: Union[bytes, str]) -> Optional[Dict]:
+    """反序列化缓存数据，当前环境无法解码时返回None"""
+    if isinstance(raw, bytes) and raw.startswith(_PARQUET_PAYLOAD_MAGIC):
+        if not HAS_PARQUET:
+            return None
+        header_end = len(_PARQUET_PAYLOAD_MAGIC) + 4
+        meta_len = struct.unpack('>I', raw[len(_PARQUET_PAYLOAD_MAGIC):header_end])[0]
+        data = _decode_json(raw[header_end:header_end + meta_len])
+        frame = pd.read_parquet(io.BytesIO(raw[header_end + meta_len:]))
+        data['data'] = frame.to_dict(orient='records')
+        return data
+    if isinstance(raw, bytes) and raw.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            return None
+        raw = zstandard.ZstdDecompressor().decompress(raw)
+    return _decode_json(raw)
+
+
+class _AkshareRequests:
+    """
+    akshare模块中requests的替身：get/post走当前线程的Session，其余属性转发给requests
+    
+    每个线程使用自己的Session（Session未保证线程安全），但共享同一个HTTPAdapter，
+    连接池在线程之间复用。Session不保留响应设置的cookie，与模块级requests.get一致。
+    """
+    
+    def __init__(self, adapter: 'HTTPAdapter'):
+        self._adapter = adapter
+        self._local = threading.local()
+    
+    def _session(self) -> 'requests.Session':
+        """获取当前线程的Session，首次使用时创建"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+        return session
+    
+    def get(self, url, params=None, **kwargs):
+        return self._session().get(url, params=params, **kwargs)
+    
+    def post(self, url, data=None, json=None, **kwargs):
+        return self._session().post(url, data=data, json=json, **kwargs)
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(requests, name)
+
+
+_AKSHARE_REQUESTS = None  # 已安装到akshare模块中的requests替身（未安装时为None）
+
+
+def _install_http_session():
+    """
+    让akshare内部的requests.get/requests.post复用带连接池和重试的Session
+    
+    akshare各接口直接调用模块级的requests.get/post，每次都会新建TCP+TLS连接。
+    这里只替换akshare各子模块中的requests名称（requests模块本身和其他调用方不受影响），
+    同一主机的连续请求可复用已建立的连接。akshare在导入时加载全部子模块，进程内只安装一次。
+    
+    5xx重试用尽后返回最后一次响应（raise_on_status=False），不会抛出RetryError，
+    调用方看到的响应和异常类型与直接使用requests.get/post时相同。
+    """
+    global _AKSHARE_REQUESTS
+    if _AKSHARE_REQUESTS is not None or requests is None:
+        return
+    
+    retry = Retry(total=HTTP_RETRY_TOTAL, backoff_factor=0.2, status_forcelist=(500, 502, 503, 504),
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                          max_retries=retry)
+    _AKSHARE_REQUESTS = _AkshareRequests(adapter)
+    for name, module in list(sys.modules.items()):
+        if (name == 'akshare' or name.startswith('akshare.')) and getattr(module, 'requests', None) is requests:
+            module.requests = _AKSHARE_REQUESTS
+
+
+def _parse_daily_dates(dates: pd.Series) -> pd.Series:
+    """将日期列转换为datetime64，优先按YYYY-MM-DD快速解析，格式不符时回退到自动推断"""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    try:
+        return pd.to_datetime(dates, format='%Y-%m-%d', cache=True)
+    except (ValueError, TypeError):
+        return pd.to_datetime(dates, cache=True)
+
+
+def _format_daily_dates(dates: pd.Series) -> np.ndarray:
+    """将datetime64日期列格式化为YYYY-MM-DD字符串数组（NumPy的C实现，比dt.strftime快得多）"""
+    return np.datetime_as_string(dates.to_numpy(dtype='datetime64[D]'), unit='D')
+
+
+def _slice_date_range(df: pd.DataFrame, start_dt: pd.Timestamp, end_dt: pd.Timestamp) -> pd.DataFrame:
+    """按日期闭区间截取已按date列升序排列的DataFrame（二分查找，无需构造布尔掩码）"""
+    dates = df['date'].to_numpy()
+    lo = dates.searchsorted(start_dt.to_datetime64(), side='left')
+    hi = dates.searchsorted(end_dt.to_datetime64(), side='right')
+    return df.iloc[lo:hi]
+
+
+# 行情快照中的价格列和成交量/成交额列
+_SPOT_PRICE_COLUMNS = ['最新价', '涨跌幅', '涨跌额', '最高', '最低', '今开', '昨收']
+_SPOT_VOLUME_COLUMNS = ['成交量', '成交额']
+
+
+def _coerce_spot_columns(spot_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    行情快照取回后按列一次性转换为数值类型
+    
+    成交量/成交额的缺失值补0，之后按代码取行时无需再逐个字段做pd.notna判断。
+    """
+    price_columns = [col for col in _SPOT_PRICE_COLUMNS if col in spot_df.columns]
+    volume_columns = [col for col in _SPOT_VOLUME_COLUMNS if col in spot_df.columns]
+    if price_columns:
+        spot_df[price_columns] = spot_df[price_columns].apply(pd.to_numeric, errors='coerce')
+    if volume_columns:
+        spot_df[volume_columns] = spot_df[volume_columns].apply(pd.to_numeric, errors='coerce').fillna(0)
+    return spot_df
+
+
+def _index_spot_df(spot_df: pd.DataFrame) -> pd.DataFrame:
+    """将行情快照按'代码'建立索引（重复代码保留第一条）并转换数值列"""
+    spot_df.index = spot_df['代码'].astype(str)
+    return _coerce_spot_columns(spot_df[~spot_df.index.duplicated(keep='first')].copy())
+
+
+def _spot_row(spot_df: pd.DataFrame, code: str) -> Optional[Dict]:
+    """按代码取出快照中的一行（只为这一行构造字典），不存在时返回None"""
+    if code not in spot_df.index:
+        return None
+    return spot_df.loc[code].to_dict()
+
+
+def _build_tick_list(recent_data: pd.DataFrame) -> List[Dict]:
+    """按列批量转换分时数据为[{time, price, volume}]列表（避免iterrows逐行构造Series）"""
+    index = recent_data.index
+    if hasattr(index, 'strftime'):
+        times = index.strftime('%H:%M').tolist()
+    else:
+        times = index.astype(str).tolist()
+    prices = pd.to_numeric(recent_data['close'], errors='coerce').fillna(0).tolist()
+    volumes = pd.to_numeric(recent_data['volume'], errors='coerce').fillna(0).astype('int64').tolist()
+    return [
+        {'time': t, 'price': p, 'volume': v}
+        for t, p, v in zip(times, prices, volumes)
+    ]
+
+
+# 股票代码到名称的查找表（名称极少变化，进程内缓存）
+_STOCK_NAMES = {}
+
+
+def _get_stock_name(symbol: str) -> Optional[str]:
+    """获取股票名称，未缓存时请求个股信息接口，获取失败时返回None"""
+    name = _STOCK_NAMES.get(symbol)
+    if name is None:
+        info_df = ak.stock_individual_info_em(symbol=symbol)
+        name = dict(zip(info_df['item'], info_df['value'])).get('股票简称')
+        if name is None or pd.isna(name):
+            return None
+        name = str(name)
+        _STOCK_NAMES[symbol] = name
+    return name
+
+
+def _fetch_realtime_quote(symbol: str, get_market_status: Callable[[], str],
+                          fetch_bid_ask: Optional[Callable[[str], pd.DataFrame]] = None) -> Optional[Dict]:
+    """
+    通过个股行情接口获取单只股票的实时数据（只下载该股票的数据）
+    
+    字段与全市场快照路径一致，名称来自个股信息接口（进程内缓存）。
+    
+    Args:
+        symbol: 股票代码
+        get_market_status: 返回当前市场状态的函数
+        fetch_bid_ask: 获取个股盘口行情的函数，默认直接调用ak.stock_bid_ask_em
+        
+    Returns:
+        实时数据字典，获取失败时返回None（调用方回退到全市场快照）
+    """
+    try:
+        if fetch_bid_ask is None:
+            quote_df = ak.stock_bid_ask_em(symbol=symbol)
+        else:
+            quote_df = fetch_bid_ask(symbol)
+        quote = dict(zip(quote_df['item'], quote_df['value']))
+        if pd.isna(quote.get('最新')):
+            return None
+        name = _get_stock_name(symbol)
+        if name is None:
+            return None
+        
+        return {
+            'success': True,
+            'code': symbol,
+            'name': name,
+            'current_price': float(quote['最新']),
+            'change_percent': float(quote['涨幅']),
+            'change_amount': float(quote['涨跌']),
+            'volume': int(quote['总手']) if pd.notna(quote.get('总手')) else 0,
+            'turnover': float(quote['金额']) if pd.notna(quote.get('金额')) else 0,
+            'high': float(quote['最高']),
+            'low': float(quote['最低']),
+            'open': float(quote['今开']),
+            'yesterday_close': float(quote['昨收']),
+            'update_time': _now_str(),
+            'market_status': get_market_status()
+        }
+    except Exception as e:
+        logger.warning("个股行情接口获取失败: %s, %s", symbol, e)
+        return None
+
+
+def _summary_loop(close, high, low, volume):
+    """一次遍历计算首尾收盘价、最高价、最低正价、成交量总和及有效成交量个数（NaN自动跳过），由numba编译后使用"""
+    max_price = -np.inf
+    min_price = np.inf
+    total_volume = 0.0
+    volume_count = 0
+    for i in range(close.shape[0]):
+        if high[i] > max_price:
+            max_price = high[i]
+        if 0 < low[i] < min_price:
+            min_price = low[i]
+        if volume[i] == volume[i]:
+            total_volume += volume[i]
+            volume_count += 1
+    if max_price == -np.inf:
+        max_price = np.nan
+    if min_price == np.inf:
+        min_price = 0.0
+    return close[0], close[close.shape[0] - 1], max_price, min_price, total_volume, volume_count
+
+
+_SUMMARY_KERNEL = None  # numba编译后的_summary_loop（首次使用时生成）
+
+
+def _get_summary_kernel() -> Optional[Callable]:
+    """首次需要时才导入numba并编译统计内核，未安装或导入失败时返回None"""
+    global _SUMMARY_KERNEL, HAS_NUMBA
+    if _SUMMARY_KERNEL is None and HAS_NUMBA:
+        try:
+            from numba import njit
+            _SUMMARY_KERNEL = njit(cache=True)(_summary_loop)
+        except ImportError:
+            HAS_NUMBA = False
+    return _SUMMARY_KERNEL
+
+
+# A股股票代码前缀
+_A_STOCK_PREFIXES = frozenset({'00', '30', '60'})
+
+# 请求日期格式（YYYY-MM-DD）
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# 区间内没有数据时的错误信息（与获取失败区分）
+_NO_DATA_ERROR = "暂无数据"
+
 class DataCache:
-    """数据缓存管理类"""
+    """数据缓存管理类（进程内LRU + 单文件SQLite存储）"""
     
     def __init__(self):
-        """初始化缓存目录"""
-        if not os.path.exists(CACHE_DIR):
-            os.makedirs(CACHE_DIR)
+        """初始化缓存目录和SQLite存储"""
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        
+        # 进程内缓存，命中时无需查询SQLite和反序列化
+        self._memory = TTLCache(maxsize=CACHE_MEMORY_SIZE, ttl=CACHE_EXPIRE_HOURS * 3600)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(CACHE_DIR, 'cache.sqlite3'),
+            timeout=10,
+            check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, created REAL NOT NULL, data BLOB NOT NULL)'
+        )
+        # 每次写入都会按created清理过期条目，建索引避免全表扫描
+        self._conn.execute('CREATE INDEX IF NOT EXISTS cache_created ON cache (created)')
+        self._conn.commit()
     
     def _get_cache_key(self, symbol: str, start_date: str, end_date: str, data_type: str) -> str:
         """生成缓存键"""
         cache_string = f"{symbol}_{start_date}_{end_date}_{data_type}"
+        if xxhash is not None:
+            return xxhash.xxh3_64_hexdigest(cache_string)
         return hashlib.md5(cache_string.encode()).hexdigest()
     
-    def _get_cache_file(self, cache_key: str) -> str:
-        """获取缓存文件路径"""
-        return os.path.join(CACHE_DIR, f"{cache_key}.json")
-    
     def get(self, symbol: str, start_date: str, end_date: str, data_type: str) -> Optional[Dict]:
         """从缓存获取数据"""
         try:
             cache_key = self._get_cache_key(symbol, start_date, end_date, data_type)
-            cache_file = self._get_cache_file(cache_key)
             
-            if not os.path.exists(cache_file):
+            cached = self._memory.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT created, data FROM cache WHERE key = ?', (cache_key,)
+                ).fetchone()
+            
+            if row is None:
                 return None
             
             # 检查缓存是否过期
-            file_time = os.path.getmtime(cache_file)
-            current_time = time.time()
-            if (current_time - file_time) > (CACHE_EXPIRE_HOURS * 3600):
-                os.remove(cache_file)
+            created, payload = row
+            remaining = CACHE_EXPIRE_HOURS * 3600 - (time.time() - created)
+            if remaining < 0:
+                with self._lock:
+                    self._conn.execute('DELETE FROM cache WHERE key = ?', (cache_key,))
+                    self._conn.commit()
                 return None
             
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            data = _loads_cache_payload(payload)
+            if data is not None:
+                # 按剩余有效期放入进程内缓存
+                self._memory.set(cache_key, data, ttl=remaining)
+            return data
         except Exception:
             return None
     
@@ -89,23 +537,163 @@ class DataCache:
         """设置缓存数据"""
         try:
             cache_key = self._get_cache_key(symbol, start_date, end_date, data_type)
-            cache_file = self._get_cache_file(cache_key)
-            
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            current_time = time.time()
+            self._memory[cache_key] = data
+            payload = _dumps_cache_payload(data)
+            
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO cache (key, created, data) VALUES (?, ?, ?)',
+                    (cache_key, current_time, payload)
+                )
+                # 顺带清理已过期的条目
+                self._conn.execute(
+                    'DELETE FROM cache WHERE created < ?',
+                    (current_time - CACHE_EXPIRE_HOURS * 3600,)
+                )
+                self._conn.commit()
         except Exception:
             pass  # 缓存失败不影响主要功能
 
 
+class DailyBarStore:
+    """日K数据本地存储（每个代码一个parquet文件，按增量追加更新）"""
+    
+    def __init__(self):
+        """初始化存储目录，未安装parquet引擎时存储不可用"""
+        self.available = HAS_PARQUET
+        if self.available:
+            os.makedirs(DAILY_STORE_DIR, exist_ok=True)
+    
+    def _get_store_file(self, symbol: str) -> str:
+        """获取存储文件路径"""
+        return os.path.join(DAILY_STORE_DIR, f"{symbol}.parquet")
+    
+    def _get_meta_file(self, symbol: str) -> str:
+        """获取覆盖范围元数据文件路径"""
+        return os.path.join(DAILY_STORE_DIR, f"{symbol}.json")
+    
+    def load(self, symbol: str) -> Tuple[Optional[pd.DataFrame], Optional[Dict]]:
+        """
+        读取本地日K数据
+        
+        Returns:
+            (日K DataFrame, 覆盖范围元数据{start, end, checked})，
+            不存在或缺少元数据时为(None, None)
+        """
+        try:
+            with open(self._get_meta_file(symbol), 'rb') as f:
+                meta = _decode_json(f.read())
+            return pd.read_parquet(self._get_store_file(symbol)), meta
+        except Exception:
+            return None, None
+    
+    def save(self, symbol: str, df: pd.DataFrame, start_date: str, end_date: str):
+        """
+        写入本地日K数据及其覆盖范围（先写临时文件再替换，避免读到半写入的文件）
+        
+        Args:
+            symbol: 股票代码
+            df: 日K数据
+            start_date: 已获取过的区间开始日期（请求的日期，不一定是交易日）
+            end_date: 已获取过的区间结束日期
+        """
+        store_file = self._get_store_file(symbol)
+        try:
+            tmp_file = f"{store_file}.{os.getpid()}.tmp"
+            df.to_parquet(tmp_file, index=False)
+            os.replace(tmp_file, store_file)
+            self.save_meta(symbol, start_date, end_date)
+        except Exception:
+            pass  # 存储失败不影响主要功能
+    
+    def save_meta(self, symbol: str, start_date: str, end_date: str):
+        """更新覆盖范围和检查时间（数据已检查过且无需补充时单独调用）"""
+        meta_file = self._get_meta_file(symbol)
+        try:
+            tmp_file = f"{meta_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(_encode_json({'start': start_date, 'end': end_date, 'checked': time.time()}))
+            os.replace(tmp_file, meta_file)
+        except Exception:
+            pass
+
+
+class TTLCache:
+    """带过期时间和容量上限（LRU淘汰）的内存缓存"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        初始化内存缓存
+        
+        Args:
+            maxsize: 最大条目数，超出时淘汰最久未使用的条目
+            ttl: 条目有效期（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # {键: (过期时间, 值)}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取未过期的缓存值"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expire_at, value = item
+            if time.time() >= expire_at:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+    
+    def __setitem__(self, key: Hashable, value: Any):
+        """写入缓存值"""
+        self.set(key, value)
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """写入缓存值，ttl为空时使用默认有效期"""
+        with self._lock:
+            self._data[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+
+class _InflightCall:
+    """进行中的数据请求，供并发的相同请求等待并共享结果"""
+    
+    __slots__ = ('event', 'result', 'error')
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
 class FinancialDataService:
     """金融数据获取服务类"""
     
     def __init__(self):
         """初始化数据服务"""
+        _install_http_session()
         self.cache = DataCache()
-        self.realtime_cache = {}  # 实时数据缓存
+        self.daily_store = DailyBarStore()
         self.cache_duration = 60  # 实时数据缓存1分钟
-        self.last_realtime_update = {}
+        self.realtime_cache = TTLCache(maxsize=2048, ttl=self.cache_duration)  # 实时数据缓存
+        self._market_status_cache = (0, '')  # (秒级时间戳, 市场状态)
+        self._spot_cache = {}  # 全市场行情快照 {表名: (时间戳, DataFrame)}
+        self._inflight = {}  # 进行中的akshare请求 {请求键: _InflightCall}
+        self._inflight_lock = threading.Lock()
     
     def get_kline_data(self, symbol: str, period: str = "daily", start_date: str = None, end_date: str = None) -> Dict:
         """
@@ -121,30 +709,18 @@ class FinancialDataService:
             K线数据字典
         """
         try:
-            # 识别代码类型
-            symbol_type = self._identify_symbol_type(symbol)
-            
-            # 处理空字符串参数，将其转换为None
-            if start_date == "":
-                start_date = None
-            if end_date == "":
-                end_date = None
-                
             # 设置默认日期范围
-            if not start_date:
-                if period in ['1min', '5min', '15min', '30min', '60min']:
-                    # 分时数据默认获取最近1天
-                    end_date = datetime.now().strftime('%Y-%m-%d')
-                    start_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-                else:
-                    # 日K及以上周期默认获取最近1年
-                    end_date = datetime.now().strftime('%Y-%m-%d')
-                    start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+            start_date, end_date = self._resolve_date_range(period, start_date, end_date)
             
-            if not end_date:
-                end_date = datetime.now().strftime('%Y-%m-%d')
+            # 优先查询缓存，命中时无需识别代码类型
+            cached_data = self._get_cached_kline(symbol, period, start_date, end_date)
+            if cached_data:
+                return cached_data
+            
+            # 识别代码类型
+            symbol_type = self._identify_symbol_type(symbol)
             
-            print(f"正在获取{period}周期K线数据: {symbol}, 日期范围: {start_date} 到 {end_date}", file=sys.stderr)
+            logger.debug("正在获取%s周期K线数据: %s, 日期范围: %s 到 %s", period, symbol, start_date, end_date)
             
             # 根据周期类型获取数据
             if period in ['1min', '5min', '15min', '30min', '60min']:
@@ -171,9 +747,106 @@ class FinancialDataService:
                 
         except Exception as e:
             error_msg = f"获取{period}周期K线数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return self._create_empty_response(symbol, 'unknown', error_msg)
     
+    def get_kline_data_batch(self, symbols: List[str], period: str = "daily", start_date: str = None, end_date: str = None) -> Dict:
+        """
+        批量获取K线数据
+        
+        先一次性查询缓存，未命中的代码并发获取（最多KLINE_BATCH_WORKERS个并发）。
+        
+        Args:
+            symbols: 股票/指数代码列表
+            period: 周期类型
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            批量K线数据字典，data为{代码: K线数据字典}
+        """
+        symbols = list(dict.fromkeys(symbols))  # 去重并保持顺序
+        resolved_start, resolved_end = self._resolve_date_range(period, start_date, end_date)
+        
+        results = {}
+        missing_symbols = []
+        for symbol in symbols:
+            cached_data = self._get_cached_kline(symbol, period, resolved_start, resolved_end)
+            if cached_data:
+                results[symbol] = cached_data
+            else:
+                missing_symbols.append(symbol)
+        
+        if missing_symbols:
+            logger.debug("正在批量获取%s周期K线数据: %s", period, ', '.join(missing_symbols))
+            max_workers = min(KLINE_BATCH_WORKERS, len(missing_symbols))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(self.get_kline_data, symbol, period, start_date, end_date): symbol
+                    for symbol in missing_symbols
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+        
+        return {
+            'success': True,
+            'period': period,
+            'data': {symbol: results[symbol] for symbol in symbols},
+            'count': len(symbols),
+            'lastUpdate': _now_iso()
+        }
+    
+    def _resolve_date_range(self, period: str, start_date: Optional[str], end_date: Optional[str]) -> tuple:
+        """
+        补全K线请求的默认日期范围
+        
+        Args:
+            period: 周期类型
+            start_date: 开始日期（可为空）
+            end_date: 结束日期（可为空）
+            
+        Returns:
+            (开始日期, 结束日期)
+        """
+        date_strs = _today_strs()
+        if not start_date:
+            if period in ['1min', '5min', '15min', '30min', '60min']:
+                # 分时数据默认获取最近1天
+                return date_strs['yesterday'], date_strs['today']
+            # 日K及以上周期默认获取最近1年
+            return date_strs['year_ago'], date_strs['today']
+        
+        if not end_date:
+            end_date = date_strs['today']
+        
+        return start_date, end_date
+    
+    def _get_cached_kline(self, symbol: str, period: str, start_date: str, end_date: str) -> Optional[Dict]:
+        """
+        只从缓存中查找K线数据，不发起网络请求
+        
+        Args:
+            symbol: 股票/指数代码
+            period: 周期类型
+            start_date: 开始日期（已补全默认值）
+            end_date: 结束日期（已补全默认值）
+            
+        Returns:
+            缓存的K线数据字典，未命中时返回None
+        """
+        if period in ['1min', '5min', '15min', '30min', '60min']:
+            return self.cache.get(symbol, start_date, end_date, f'minute_{period}')
+        if period in ['weekly', 'monthly']:
+            # 周K/月K由日K数据聚合生成，不单独缓存
+            return None
+        
+        data_type = 'index' if symbol in INDEX_CODE_MAPPING else 'stock'
+        start_date, end_date = self._validate_date_range(start_date, end_date)
+        if data_type == 'index' and end_date == _today_strs()['today']:
+            # 今日指数数据需要补充实时行情，不使用缓存
+            return None
+        return self.cache.get(symbol, start_date, end_date, data_type)
+    
     def _get_minute_data(self, symbol: str, period: str, start_date: str, end_date: str) -> Dict:
         """
         获取分时数据
@@ -204,22 +877,25 @@ class FinancialDataService:
             
             ak_period = period_mapping.get(period, '1')
             
-            print(f"正在获取分时数据: {symbol}, 周期: {period} ({ak_period}分钟)", file=sys.stderr)
+            logger.debug("正在获取分时数据: %s, 周期: %s (%s分钟)", symbol, period, ak_period)
             
             # 使用akshare获取分时数据
-            df = ak.stock_zh_a_hist_min_em(
-                symbol=symbol,
-                period=ak_period,
-                start_date=f"{start_date} 09:30:00",
-                end_date=f"{end_date} 15:00:00",
-                adjust=""
+            df = self._singleflight(
+                ('stock_zh_a_hist_min_em', symbol, ak_period, start_date, end_date),
+                lambda: ak.stock_zh_a_hist_min_em(
+                    symbol=symbol,
+                    period=ak_period,
+                    start_date=f"{start_date} 09:30:00",
+                    end_date=f"{end_date} 15:00:00",
+                    adjust=""
+                )
             )
             
             if df.empty:
                 return self._create_empty_response(symbol, 'stock', "暂无分时数据")
             
-            # 处理数据格式
-            df = df.rename(columns={
+            # 处理数据格式（原地重命名，避免复制整个DataFrame）
+            df.rename(columns={
                 '时间': 'date',
                 '开盘': 'open',
                 '收盘': 'close',
@@ -227,7 +903,7 @@ class FinancialDataService:
                 '最低': 'low',
                 '成交量': 'volume',
                 '成交额': 'amount'
-            })
+            }, inplace=True)
             
             # 确保必要的列存在
             required_columns = ['date', 'open', 'close', 'high', 'low', 'volume']
@@ -235,50 +911,28 @@ class FinancialDataService:
                 if col not in df.columns:
                     df[col] = 0
             
-            # 处理数据类型
-            for col in ['open', 'close', 'high', 'low']:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+            # 只保留需要的列，丢弃akshare返回的其他列
+            df = df[required_columns].copy()
             
-            df['volume'] = pd.to_numeric(df['volume'], errors='coerce').fillna(0)
+            # 处理数据类型（一次性转换全部数值列）
+            numeric_columns = ['open', 'close', 'high', 'low', 'volume']
+            df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors='coerce')
+            df['volume'] = df['volume'].fillna(0)
             
             # 按时间排序
-            df['date'] = pd.to_datetime(df['date'])
+            df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d %H:%M:%S', cache=True)
             df = df.sort_values('date')
             
-            # 转换为前端需要的格式
-            data_list = []
-            for _, row in df.iterrows():
-                data_list.append({
-                    'date': row['date'].strftime('%Y-%m-%d %H:%M'),
-                    'open': float(row['open']) if pd.notna(row['open']) else 0,
-                    'close': float(row['close']) if pd.notna(row['close']) else 0,
-                    'high': float(row['high']) if pd.notna(row['high']) else 0,
-                    'low': float(row['low']) if pd.notna(row['low']) else 0,
-                    'volume': int(row['volume']) if pd.notna(row['volume']) else 0
-                })
+            # 转换为前端需要的格式（向量化处理，避免逐行iterrows）
+            out = df
+            out['date'] = out['date'].dt.strftime('%Y-%m-%d %H:%M')
+            out[['open', 'close', 'high', 'low']] = out[['open', 'close', 'high', 'low']].astype('float64').fillna(0)
+            out['volume'] = out['volume'].fillna(0).astype('int64')
             
             # 计算统计信息
-            if data_list:
-                first_price = data_list[0]['close']
-                last_price = data_list[-1]['close']
-                change_percent = ((last_price - first_price) / first_price * 100) if first_price != 0 else 0
-                max_price = max([d['high'] for d in data_list])
-                min_price = min([d['low'] for d in data_list if d['low'] > 0])
-                avg_volume = sum([d['volume'] for d in data_list]) / len(data_list)
-                
-                summary = {
-                    'changePercent': round(change_percent, 2),
-                    'maxPrice': round(max_price, 2),
-                    'minPrice': round(min_price, 2),
-                    'avgVolume': int(avg_volume)
-                }
-            else:
-                summary = {
-                    'changePercent': 0,
-                    'maxPrice': 0,
-                    'minPrice': 0,
-                    'avgVolume': 0
-                }
+            summary = self._calculate_summary(out)
+            
+            data_list = out.to_dict(orient='records')
             
             result = {
                 'success': True,
@@ -289,7 +943,7 @@ class FinancialDataService:
                 'data': data_list,
                 'summary': summary,
                 'dataCount': len(data_list),
-                'lastUpdate': datetime.now().isoformat(),
+                'lastUpdate': _now_iso(),
                 'period': period
             }
             
@@ -301,7 +955,7 @@ class FinancialDataService:
             
         except Exception as e:
             error_msg = f"获取分时数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return self._create_empty_response(symbol, 'stock', error_msg)
     
     def _get_weekly_data(self, symbol: str, start_date: str, end_date: str) -> Dict:
@@ -317,60 +971,25 @@ class FinancialDataService:
             周K数据字典
         """
         try:
-            # 先获取日K数据
-            daily_data = self.get_financial_data(symbol, start_date, end_date)
+            # 先获取日K数据（直接复用标准化后的DataFrame）
+            daily_data, daily_df = self._get_daily_df(symbol, start_date, end_date)
             
             if not daily_data.get('success', False):
                 return daily_data
             
-            # 将日K数据转换为周K数据
-            daily_df = pd.DataFrame(daily_data['data'])
-            daily_df['date'] = pd.to_datetime(daily_df['date'])
-            daily_df = daily_df.sort_values('date')
-            
             # 按周分组
-            weekly_df = daily_df.resample('W', on='date').agg({
-                'open': 'first',
-                'close': 'last',
-                'high': 'max',
-                'low': 'min',
-                'volume': 'sum'
-            }).reset_index()
-            
-            # 转换为列表格式
-            data_list = []
-            for _, row in weekly_df.iterrows():
-                data_list.append({
-                    'date': row['date'].strftime('%Y-%m-%d'),
-                    'open': float(row['open']),
-                    'close': float(row['close']),
-                    'high': float(row['high']),
-                    'low': float(row['low']),
-                    'volume': int(row['volume'])
-                })
-            
-            # 更新统计信息
-            if data_list:
-                first_price = data_list[0]['close']
-                last_price = data_list[-1]['close']
-                change_percent = ((last_price - first_price) / first_price * 100) if first_price != 0 else 0
-                max_price = max([d['high'] for d in data_list])
-                min_price = min([d['low'] for d in data_list if d['low'] > 0])
-                avg_volume = sum([d['volume'] for d in data_list]) / len(data_list)
-                
-                summary = {
-                    'changePercent': round(change_percent, 2),
-                    'maxPrice': round(max_price, 2),
-                    'minPrice': round(min_price, 2),
-                    'avgVolume': int(avg_volume)
-                }
-            else:
-                summary = {
-                    'changePercent': 0,
-                    'maxPrice': 0,
-                    'minPrice': 0,
-                    'avgVolume': 0
-                }
+            weekly_df = self._resample_ohlcv(daily_df, 'W')
+            
+            # 转换为列表格式（向量化处理，避免逐行iterrows）
+            out = weekly_df  # 聚合结果是新建的DataFrame，可直接原地处理
+            out['date'] = _format_daily_dates(out['date'])
+            out[['open', 'close', 'high', 'low']] = out[['open', 'close', 'high', 'low']].astype('float64').fillna(0)
+            out['volume'] = out['volume'].fillna(0).astype('int64')
+            
+            # 计算统计信息
+            summary = self._calculate_summary(out)
+            
+            data_list = out.to_dict(orient='records')
             
             result = {
                 'success': True,
@@ -381,7 +1000,7 @@ class FinancialDataService:
                 'data': data_list,
                 'summary': summary,
                 'dataCount': len(data_list),
-                'lastUpdate': datetime.now().isoformat(),
+                'lastUpdate': _now_iso(),
                 'period': 'weekly'
             }
             
@@ -389,7 +1008,7 @@ class FinancialDataService:
             
         except Exception as e:
             error_msg = f"获取周K数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return self._create_empty_response(symbol, 'unknown', error_msg)
     
     def _get_monthly_data(self, symbol: str, start_date: str, end_date: str) -> Dict:
@@ -405,60 +1024,25 @@ class FinancialDataService:
             月K数据字典
         """
         try:
-            # 先获取日K数据
-            daily_data = self.get_financial_data(symbol, start_date, end_date)
+            # 先获取日K数据（直接复用标准化后的DataFrame）
+            daily_data, daily_df = self._get_daily_df(symbol, start_date, end_date)
             
             if not daily_data.get('success', False):
                 return daily_data
             
-            # 将日K数据转换为月K数据
-            daily_df = pd.DataFrame(daily_data['data'])
-            daily_df['date'] = pd.to_datetime(daily_df['date'])
-            daily_df = daily_df.sort_values('date')
-            
             # 按月分组
-            monthly_df = daily_df.resample('M', on='date').agg({
-                'open': 'first',
-                'close': 'last',
-                'high': 'max',
-                'low': 'min',
-                'volume': 'sum'
-            }).reset_index()
-            
-            # 转换为列表格式
-            data_list = []
-            for _, row in monthly_df.iterrows():
-                data_list.append({
-                    'date': row['date'].strftime('%Y-%m-%d'),
-                    'open': float(row['open']),
-                    'close': float(row['close']),
-                    'high': float(row['high']),
-                    'low': float(row['low']),
-                    'volume': int(row['volume'])
-                })
-            
-            # 更新统计信息
-            if data_list:
-                first_price = data_list[0]['close']
-                last_price = data_list[-1]['close']
-                change_percent = ((last_price - first_price) / first_price * 100) if first_price != 0 else 0
-                max_price = max([d['high'] for d in data_list])
-                min_price = min([d['low'] for d in data_list if d['low'] > 0])
-                avg_volume = sum([d['volume'] for d in data_list]) / len(data_list)
-                
-                summary = {
-                    'changePercent': round(change_percent, 2),
-                    'maxPrice': round(max_price, 2),
-                    'minPrice': round(min_price, 2),
-                    'avgVolume': int(avg_volume)
-                }
-            else:
-                summary = {
-                    'changePercent': 0,
-                    'maxPrice': 0,
-                    'minPrice': 0,
-                    'avgVolume': 0
-                }
+            monthly_df = self._resample_ohlcv(daily_df, 'M')
+            
+            # 转换为列表格式（向量化处理，避免逐行iterrows）
+            out = monthly_df  # 聚合结果是新建的DataFrame，可直接原地处理
+            out['date'] = _format_daily_dates(out['date'])
+            out[['open', 'close', 'high', 'low']] = out[['open', 'close', 'high', 'low']].astype('float64').fillna(0)
+            out['volume'] = out['volume'].fillna(0).astype('int64')
+            
+            # 计算统计信息
+            summary = self._calculate_summary(out)
+            
+            data_list = out.to_dict(orient='records')
             
             result = {
                 'success': True,
@@ -469,7 +1053,7 @@ class FinancialDataService:
                 'data': data_list,
                 'summary': summary,
                 'dataCount': len(data_list),
-                'lastUpdate': datetime.now().isoformat(),
+                'lastUpdate': _now_iso(),
                 'period': 'monthly'
             }
             
@@ -477,7 +1061,7 @@ class FinancialDataService:
             
         except Exception as e:
             error_msg = f"获取月K数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return self._create_empty_response(symbol, 'unknown', error_msg)
     
     def get_index_realtime_data(self, symbol: str) -> Dict:
@@ -492,13 +1076,10 @@ class FinancialDataService:
         """
         try:
             # 检查缓存是否有效
-            current_time = time.time()
-            cache_key = f"index_realtime_{symbol}"
-            
-            if (cache_key in self.realtime_cache and 
-                cache_key in self.last_realtime_update and
-                current_time - self.last_realtime_update[cache_key] < self.cache_duration):
-                return self.realtime_cache[cache_key]
+            cache_key = ('index_realtime', symbol)
+            cached_result = self.realtime_cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
             
             # 检查是否为支持的指数
             if symbol not in INDEX_CODE_MAPPING:
@@ -506,36 +1087,44 @@ class FinancialDataService:
                     'success': False,
                     'code': symbol,
                     'error': f'不支持的指数代码: {symbol}',
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'update_time': _now_str()
                 }
             
             ak_symbol = INDEX_CODE_MAPPING[symbol]['ak_symbol']
-            print(f"正在获取指数实时数据: {symbol} ({ak_symbol})", file=sys.stderr)
+            logger.debug("正在获取指数实时数据: %s (%s)", symbol, ak_symbol)
             
             # 获取指数实时数据 - 使用正确的API
             # 尝试使用不同API获取指数实时数据
             index_data = None
             try:
-                # 方法1：使用stock_zh_index_spot_em
-                index_data = ak.stock_zh_index_spot_em()
-                # 筛选特定指数
-                index_data = index_data[index_data['代码'] == ak_symbol]
+                # 方法1：使用stock_zh_index_spot_em，先查只有几十行的沪深重要指数表
+                # （与大盘数据共用快照），不在其中时再按交易所获取对应的系列指数表
+                index_data = self._get_spot_df(
+                    'index_spot_em_important',
+                    lambda: ak.stock_zh_index_spot_em(symbol="沪深重要指数")
+                )
+                if ak_symbol not in index_data.index:
+                    series = "上证系列指数" if symbol.endswith('.SH') else "深证系列指数"
+                    index_data = self._get_spot_df(
+                        f'index_spot_em_{series}',
+                        lambda: ak.stock_zh_index_spot_em(symbol=series)
+                    )
             except Exception as e1:
-                print(f"方法1失败: {e1}", file=sys.stderr)
+                logger.warning("方法1失败: %s", e1)
                 try:
                     # 方法2：使用index_zh_a_spot_em
-                    index_data = ak.index_zh_a_spot_em()
-                    index_data = index_data[index_data['代码'] == ak_symbol]
+                    index_data = self._get_spot_df('index_zh_a_spot_em', ak.index_zh_a_spot_em)
                 except Exception as e2:
-                    print(f"方法2失败: {e2}", file=sys.stderr)
+                    logger.warning("方法2失败: %s", e2)
                     raise Exception(f"无法获取指数数据: {e1}")
             
-            if not index_data.empty:
-                row = index_data.iloc[0]
+            # 筛选特定指数
+            if ak_symbol in index_data.index:
+                row = index_data.loc[ak_symbol]
                 result = {
                     'success': True,
                     'code': symbol,
-                    'name': INDEX_CODE_MAPPING[symbol]['name'],
+                    'name': _INDEX_NAMES[symbol],
                     'current': float(row['最新价']) if '最新价' in row else 0,
                     'change_percent': float(row['涨跌幅']) if '涨跌幅' in row else 0,
                     'change_amount': float(row['涨跌额']) if '涨跌额' in row else 0,
@@ -543,15 +1132,14 @@ class FinancialDataService:
                     'low': float(row['最低']) if '最低' in row else 0,
                     'open': float(row['今开']) if '今开' in row else 0,
                     'yesterday_close': float(row['昨收']) if '昨收' in row else 0,
-                    'volume': int(row['成交量']) if '成交量' in row and pd.notna(row['成交量']) else 0,
-                    'turnover': float(row['成交额']) if '成交额' in row and pd.notna(row['成交额']) else 0,
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'volume': int(row['成交量']) if '成交量' in row else 0,
+                    'turnover': float(row['成交额']) if '成交额' in row else 0,
+                    'update_time': _now_str(),
                     'market_status': self._get_market_status()
                 }
                 
                 # 更新缓存
                 self.realtime_cache[cache_key] = result
-                self.last_realtime_update[cache_key] = current_time
                 
                 return result
             else:
@@ -559,17 +1147,17 @@ class FinancialDataService:
                     'success': False,
                     'code': symbol,
                     'error': '未找到该指数的实时数据',
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'update_time': _now_str()
                 }
                 
         except Exception as e:
             error_msg = f"获取指数实时数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return {
                 'success': False,
                 'code': symbol,
                 'error': error_msg,
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'update_time': _now_str()
             }
 
     def get_realtime_data(self, symbol: str) -> Dict:
@@ -584,24 +1172,19 @@ class FinancialDataService:
         """
         try:
             # 检查缓存是否有效
-            current_time = time.time()
-            cache_key = f"realtime_{symbol}"
+            cache_key = ('realtime', symbol)
+            cached_result = self.realtime_cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
             
-            if (cache_key in self.realtime_cache and 
-                cache_key in self.last_realtime_update and
-                current_time - self.last_realtime_update[cache_key] < self.cache_duration):
-                return self.realtime_cache[cache_key]
+            logger.debug("正在获取实时数据: %s", symbol)
             
-            print(f"正在获取实时数据: {symbol}", file=sys.stderr)
-            
-            # 获取实时行情数据
-            realtime_data = ak.stock_zh_a_spot_em()
+            # 获取实时行情数据（全市场快照在短时间内复用）
+            realtime_data = self._get_spot_df('stock_spot_em', ak.stock_zh_a_spot_em)
             
             # 筛选特定股票
-            stock_data = realtime_data[realtime_data['代码'] == symbol]
-            
-            if not stock_data.empty:
-                row = stock_data.iloc[0]
+            if symbol in realtime_data.index:
+                row = realtime_data.loc[symbol]
                 result = {
                     'success': True,
                     'code': symbol,
@@ -609,19 +1192,18 @@ class FinancialDataService:
                     'current_price': float(row['最新价']),
                     'change_percent': float(row['涨跌幅']),
                     'change_amount': float(row['涨跌额']),
-                    'volume': int(row['成交量']) if pd.notna(row['成交量']) else 0,
-                    'turnover': float(row['成交额']) if pd.notna(row['成交额']) else 0,
+                    'volume': int(row['成交量']),
+                    'turnover': float(row['成交额']),
                     'high': float(row['最高']),
                     'low': float(row['最低']),
                     'open': float(row['今开']),
                     'yesterday_close': float(row['昨收']),
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'update_time': _now_str(),
                     'market_status': self._get_market_status()
                 }
                 
                 # 更新缓存
                 self.realtime_cache[cache_key] = result
-                self.last_realtime_update[cache_key] = current_time
                 
                 return result
             else:
@@ -629,17 +1211,80 @@ class FinancialDataService:
                     'success': False,
                     'code': symbol,
                     'error': '未找到该股票的实时数据',
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'update_time': _now_str()
                 }
                 
         except Exception as e:
             error_msg = f"获取实时数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return {
                 'success': False,
                 'code': symbol,
                 'error': error_msg,
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'update_time': _now_str()
+            }
+    
+    def get_realtime_batch(self, symbols: List[str]) -> Dict:
+        """
+        批量获取股票实时数据
+        
+        未命中缓存的代码并发请求个股行情接口（最多REALTIME_BATCH_CONCURRENCY个并发），
+        只下载所需股票的数据；个股接口失败的代码回退到全市场快照。
+        
+        Args:
+            symbols: 股票代码列表
+            
+        Returns:
+            批量实时数据字典，data按输入顺序排列
+        """
+        try:
+            symbols = list(dict.fromkeys(symbols))  # 去重并保持顺序
+            results = {}
+            missing_symbols = []
+            
+            for symbol in symbols:
+                cached_result = self.realtime_cache.get(('realtime', symbol))
+                if cached_result is not None:
+                    results[symbol] = cached_result
+                else:
+                    missing_symbols.append(symbol)
+            
+            if missing_symbols:
+                logger.debug("正在批量获取实时数据: %s", ', '.join(missing_symbols))
+                max_workers = min(REALTIME_BATCH_CONCURRENCY, len(missing_symbols))
+                
+                def fetch_bid_ask(code: str) -> pd.DataFrame:
+                    return self._singleflight(('stock_bid_ask_em', code), lambda: ak.stock_bid_ask_em(symbol=code))
+                
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    quotes = list(executor.map(
+                        lambda code: _fetch_realtime_quote(code, self._get_market_status, fetch_bid_ask),
+                        missing_symbols
+                    ))
+                
+                for symbol, quote in zip(missing_symbols, quotes):
+                    if quote is None:
+                        # 个股接口失败，回退到全市场快照
+                        results[symbol] = self.get_realtime_data(symbol)
+                    else:
+                        self.realtime_cache[('realtime', symbol)] = quote
+                        results[symbol] = quote
+            
+            return {
+                'success': True,
+                'data': [results[symbol] for symbol in symbols],
+                'count': len(symbols),
+                'update_time': _now_str()
+            }
+            
+        except Exception as e:
+            error_msg = f"批量获取实时数据失败：{str(e)}"
+            logger.error(error_msg)
+            return {
+                'success': False,
+                'error': error_msg,
+                'data': [],
+                'update_time': _now_str()
             }
     
     def get_realtime_tick_data(self, symbol: str, count: int = 50) -> Dict:
@@ -654,7 +1299,7 @@ class FinancialDataService:
             分时数据字典
         """
         try:
-            print(f"正在获取分时数据: {symbol}", file=sys.stderr)
+            logger.debug("正在获取分时数据: %s", symbol)
             
             # 获取分时数据 - 使用不同的API
             try:
@@ -665,20 +1310,14 @@ class FinancialDataService:
                     # 获取最新的count条数据
                     recent_data = tick_data.tail(count)
                     
-                    tick_list = []
-                    for _, row in recent_data.iterrows():
-                        tick_list.append({
-                            'time': row.name.strftime('%H:%M') if hasattr(row.name, 'strftime') else str(row.name),
-                            'price': float(row['close']) if pd.notna(row['close']) else 0,
-                            'volume': int(row['volume']) if pd.notna(row['volume']) else 0
-                        })
+                    tick_list = _build_tick_list(recent_data)
                     
                     return {
                         'success': True,
                         'code': symbol,
                         'data': tick_list,
                         'count': len(tick_list),
-                        'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        'update_time': _now_str()
                     }
                 else:
                     return {
@@ -686,7 +1325,7 @@ class FinancialDataService:
                         'code': symbol,
                         'error': '暂无分时数据',
                         'data': [],
-                        'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        'update_time': _now_str()
                     }
                     
             except Exception:
@@ -696,18 +1335,18 @@ class FinancialDataService:
                     'code': symbol,
                     'error': '分时数据暂不可用',
                     'data': [],
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'update_time': _now_str()
                 }
                 
         except Exception as e:
             error_msg = f"获取分时数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return {
                 'success': False,
                 'code': symbol,
                 'error': error_msg,
                 'data': [],
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'update_time': _now_str()
             }
     
     def get_market_realtime(self) -> Dict:
@@ -719,59 +1358,117 @@ class FinancialDataService:
         """
         try:
             # 检查缓存
-            current_time = time.time()
-            cache_key = "market_realtime"
+            cache_key = ('market_realtime', None)
+            cached_result = self.realtime_cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
             
-            if (cache_key in self.realtime_cache and 
-                cache_key in self.last_realtime_update and
-                current_time - self.last_realtime_update[cache_key] < self.cache_duration):
-                return self.realtime_cache[cache_key]
+            logger.debug("正在获取大盘实时数据")
             
-            print("正在获取大盘实时数据", file=sys.stderr)
-            
-            # 获取主要指数实时数据
+            # 获取主要指数实时数据（一次请求获取全部指数行情，再本地筛选）
             indices = ['sh000001', 'sz399001', 'sz399006']  # 上证、深证、创业板
             market_data = []
             
-            for index_code in indices:
-                try:
-                    index_data = ak.stock_zh_index_spot_em(symbol=index_code)
-                    if not index_data.empty:
-                        row = index_data.iloc[0]
-                        market_data.append({
-                            'code': index_code,
-                            'name': row['名称'] if '名称' in row else index_code,
-                            'current': float(row['最新价']) if '最新价' in row else 0,
-                            'change_percent': float(row['涨跌幅']) if '涨跌幅' in row else 0,
-                            'change_amount': float(row['涨跌额']) if '涨跌额' in row else 0
-                        })
-                except Exception as e:
-                    print(f"获取指数{index_code}数据失败: {e}", file=sys.stderr)
-                    continue
+            try:
+                all_index_data = self._get_spot_df(
+                    'index_spot_em_important',
+                    lambda: ak.stock_zh_index_spot_em(symbol="沪深重要指数")
+                )
+                
+                for index_code in indices:
+                    if index_code[2:] not in all_index_data.index:
+                        logger.warning("获取指数%s数据失败: 行情数据中不存在该指数", index_code)
+                        continue
+                    row = all_index_data.loc[index_code[2:]]
+                    market_data.append({
+                        'code': index_code,
+                        'name': row['名称'] if '名称' in row else index_code,
+                        'current': float(row['最新价']) if '最新价' in row else 0,
+                        'change_percent': float(row['涨跌幅']) if '涨跌幅' in row else 0,
+                        'change_amount': float(row['涨跌额']) if '涨跌额' in row else 0
+                    })
+            except Exception as e:
+                logger.warning("获取指数行情数据失败: %s", e)
             
             result = {
                 'success': True,
                 'data': market_data,
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'update_time': _now_str(),
                 'market_status': self._get_market_status()
             }
             
             # 更新缓存
             self.realtime_cache[cache_key] = result
-            self.last_realtime_update[cache_key] = current_time
             
             return result
             
         except Exception as e:
             error_msg = f"获取大盘数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return {
                 'success': False,
                 'error': error_msg,
                 'data': [],
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'update_time': _now_str()
             }
     
+    def _get_spot_df(self, name: str, fetcher) -> pd.DataFrame:
+        """
+        获取全市场行情快照（按代码索引），在SPOT_CACHE_SECONDS内复用
+        
+        Args:
+            name: 快照名称，用于区分不同的行情表
+            fetcher: 无参数的akshare行情获取函数
+            
+        Returns:
+            以'代码'为索引的行情DataFrame
+        """
+        current_time = time.time()
+        cached = self._spot_cache.get(name)
+        if cached is not None and current_time - cached[0] < SPOT_CACHE_SECONDS:
+            return cached[1]
+        
+        df = self._singleflight(('spot', name), lambda: _index_spot_df(fetcher()))
+        
+        self._spot_cache[name] = (current_time, df)
+        return df
+    
+    def _singleflight(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        合并并发的相同请求：同一键同时只执行一次fn，其余调用等待并共享结果
+        
+        Args:
+            key: 请求键
+            fn: 实际执行数据获取的无参数函数
+            
+        Returns:
+            fn的返回值；DataFrame会返回浅拷贝，避免调用方之间相互影响
+        """
+        with self._inflight_lock:
+            call = self._inflight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InflightCall()
+                self._inflight[key] = call
+        
+        if is_leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._inflight_lock:
+                    self._inflight.pop(key, None)
+                call.event.set()
+        else:
+            call.event.wait()
+        
+        if call.error is not None:
+            raise call.error
+        if isinstance(call.result, pd.DataFrame):
+            return call.result.copy(deep=False)
+        return call.result
+    
     def _get_market_status(self) -> str:
         """
         获取市场状态
@@ -779,25 +1476,28 @@ class FinancialDataService:
         Returns:
             市场状态字符串
         """
+        # 同一秒内直接复用上次的判断结果
+        current_ts = int(time.time())
+        cached_ts, cached_status = self._market_status_cache
+        if current_ts == cached_ts:
+            return cached_status
+        
         now = datetime.now()
         current_time = now.time()
         weekday = now.weekday()
         
         # 周末
         if weekday >= 5:  # 5=Saturday, 6=Sunday
-            return 'closed'
-        
+            status = 'closed'
         # 交易时间判断
-        morning_start = datetime.strptime('09:30', '%H:%M').time()
-        morning_end = datetime.strptime('11:30', '%H:%M').time()
-        afternoon_start = datetime.strptime('13:00', '%H:%M').time()
-        afternoon_end = datetime.strptime('15:00', '%H:%M').time()
-        
-        if ((morning_start <= current_time <= morning_end) or 
-            (afternoon_start <= current_time <= afternoon_end)):
-            return 'trading'
+        elif ((MORNING_START <= current_time <= MORNING_END) or 
+              (AFTERNOON_START <= current_time <= AFTERNOON_END)):
+            status = 'trading'
         else:
-            return 'closed'
+            status = 'closed'
+        
+        self._market_status_cache = (current_ts, status)
+        return status
     
     def _identify_symbol_type(self, symbol: str) -> str:
         """
@@ -814,9 +1514,8 @@ class FinancialDataService:
             return 'index'
         
         # 检查是否为A股股票代码
-        if len(symbol) == 6 and symbol.isdigit():
-            if symbol.startswith(('00', '30', '60')):
-                return 'stock'
+        if len(symbol) == 6 and symbol[:2] in _A_STOCK_PREFIXES and symbol.isdigit():
+            return 'stock'
         
         return 'unknown'
     
@@ -831,37 +1530,34 @@ class FinancialDataService:
         Returns:
             调整后的日期范围元组
         """
+        # 处理空日期参数或格式无效的日期，返回最近30天
+        if not (start_date and end_date and _DATE_RE.match(start_date) and _DATE_RE.match(end_date)):
+            date_strs = _today_strs()
+            return date_strs['month_ago'], date_strs['today']
+        
         try:
-            # 处理空日期参数
-            if not start_date or not end_date:
-                end_date = datetime.now().strftime('%Y-%m-%d')
-                start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-                return start_date, end_date
-            
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            
-            # 确保开始日期不晚于结束日期
-            if start_dt > end_dt:
-                start_dt, end_dt = end_dt, start_dt
-            
-            # 确保不超过当前日期
-            today = datetime.now()
-            if end_dt > today:
-                end_dt = today
-            
-            # 确保日期范围不超过2年（避免数据量过大）
-            max_range = timedelta(days=730)
-            if end_dt - start_dt > max_range:
-                start_dt = end_dt - max_range
-            
-            return start_dt.strftime('%Y-%m-%d'), end_dt.strftime('%Y-%m-%d')
-            
-        except ValueError as e:
-            # 如果日期格式无效，返回最近30天
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-            return start_date, end_date
+            # fromisoformat走C实现，比strptime快得多
+            start_day = date.fromisoformat(start_date)
+            end_day = date.fromisoformat(end_date)
+        except ValueError:
+            # 格式正确但日期不存在（如2024-02-30）
+            date_strs = _today_strs()
+            return date_strs['month_ago'], date_strs['today']
+        
+        # 确保开始日期不晚于结束日期
+        if start_day > end_day:
+            start_day, end_day = end_day, start_day
+        
+        # 确保不超过当前日期（今天的日期按自然日缓存）
+        today = _today_strs()['day']
+        if end_day > today:
+            end_day = today
+        
+        # 确保日期范围不超过2年（避免数据量过大）
+        if end_day - start_day > MAX_DATE_RANGE:
+            start_day = end_day - MAX_DATE_RANGE
+        
+        return start_day.isoformat(), end_day.isoformat()
     
     def _normalize_data_format(self, df: pd.DataFrame, symbol: str, symbol_type: str) -> Dict:
         """
@@ -875,95 +1571,82 @@ class FinancialDataService:
         Returns:
             标准化后的数据字典
         """
+        return self._normalize_with_frame(df, symbol, symbol_type)[0]
+    
+    def _normalize_with_frame(self, df: pd.DataFrame, symbol: str, symbol_type: str) -> Tuple[Dict, Optional[pd.DataFrame]]:
+        """
+        标准化数据格式，同时返回标准化后的日K DataFrame
+        
+        Args:
+            df: 原始数据DataFrame
+            symbol: 股票/指数代码
+            symbol_type: 代码类型
+            
+        Returns:
+            (标准化后的数据字典, 含date/open/close/high/low/volume列的DataFrame)，失败时DataFrame为None
+        """
         try:
             # 确保DataFrame不为空
             if df.empty:
-                return self._create_empty_response(symbol, symbol_type, "暂无数据")
-            
-            # 重置索引，确保日期列可访问
-            df_reset = df.reset_index()
-            
-            # 标准化列名映射
-            column_mapping = {
-                # 股票数据列名
-                '日期': 'date', 'date': 'date',
-                '开盘': 'open', 'open': 'open',
-                '收盘': 'close', 'close': 'close',
-                '最高': 'high', 'high': 'high',
-                '最低': 'low', 'low': 'low',
-                '成交量': 'volume', 'volume': 'volume',
-                '成交额': 'amount',
-                
-                # 指数数据列名
-                '开盘价': 'open',
-                '收盘价': 'close',
-                '最高价': 'high',
-                '最低价': 'low',
-            }
+                return self._create_empty_response(symbol, symbol_type, _NO_DATA_ERROR), None
             
-            # 重命名列
-            df_renamed = df_reset.rename(columns=column_mapping)
+            # akshare通常返回RangeIndex，只有日期在索引中时才需要reset_index
+            if df.index.name in ('date', '日期') or isinstance(df.index, pd.DatetimeIndex):
+                df = df.reset_index()
+            
+            # 重命名列（只处理实际需要改名的列）
+            renames = {col: _COLUMN_MAPPING[col] for col in df.columns
+                       if col in _COLUMN_MAPPING and _COLUMN_MAPPING[col] != col}
+            df_renamed = df.rename(columns=renames)
             
             # 确保必要的列存在
             required_columns = ['date', 'open', 'close', 'high', 'low']
             missing_columns = [col for col in required_columns if col not in df_renamed.columns]
             
             if missing_columns:
-                return self._create_empty_response(symbol, symbol_type, f"数据格式不完整，缺少列：{missing_columns}")
-            
-            # 处理数据类型
-            for col in ['open', 'close', 'high', 'low']:
-                df_renamed[col] = pd.to_numeric(df_renamed[col], errors='coerce')
+                return self._create_empty_response(symbol, symbol_type, f"数据格式不完整，缺少列：{missing_columns}"), None
             
             # 处理成交量（可能不存在）
-            if 'volume' in df_renamed.columns:
-                df_renamed['volume'] = pd.to_numeric(df_renamed['volume'], errors='coerce').fillna(0)
-            else:
+            if 'volume' not in df_renamed.columns:
                 df_renamed['volume'] = 0
             
+            # 处理数据类型（akshare通常已返回数值列，只转换非数值列）
+            numeric_columns = ['open', 'close', 'high', 'low', 'volume']
+            non_numeric = [col for col in numeric_columns if not pd.api.types.is_numeric_dtype(df_renamed[col])]
+            if non_numeric:
+                df_renamed[non_numeric] = df_renamed[non_numeric].apply(pd.to_numeric, errors='coerce')
+            df_renamed['volume'] = df_renamed['volume'].fillna(0)
+            
             # 按日期排序
-            df_renamed['date'] = pd.to_datetime(df_renamed['date'])
+            df_renamed['date'] = _parse_daily_dates(df_renamed['date'])
             df_renamed = df_renamed.sort_values('date')
             
-            # 转换为前端需要的格式
-            data_list = []
-            for _, row in df_renamed.iterrows():
-                data_list.append({
-                    'date': row['date'].strftime('%Y-%m-%d'),
-                    'open': float(row['open']) if pd.notna(row['open']) else 0,
-                    'close': float(row['close']) if pd.notna(row['close']) else 0,
-                    'high': float(row['high']) if pd.notna(row['high']) else 0,
-                    'low': float(row['low']) if pd.notna(row['low']) else 0,
-                    'volume': int(row['volume']) if pd.notna(row['volume']) else 0
-                })
-            
-            # 计算统计信息
-            if data_list:
-                first_price = data_list[0]['close']
-                last_price = data_list[-1]['close']
-                change_percent = ((last_price - first_price) / first_price * 100) if first_price != 0 else 0
-                max_price = max([d['high'] for d in data_list])
-                min_price = min([d['low'] for d in data_list if d['low'] > 0])
-                avg_volume = sum([d['volume'] for d in data_list]) / len(data_list)
-                
-                summary = {
-                    'changePercent': round(change_percent, 2),
-                    'maxPrice': round(max_price, 2),
-                    'minPrice': round(min_price, 2),
-                    'avgVolume': int(avg_volume)
-                }
-            else:
-                summary = {
-                    'changePercent': 0,
-                    'maxPrice': 0,
-                    'minPrice': 0,
-                    'avgVolume': 0
-                }
+            # 标准化后的日K数据，供周K/月K聚合直接复用
+            daily_df = df_renamed[['date', 'open', 'close', 'high', 'low', 'volume']].copy()
+            daily_df[['open', 'close', 'high', 'low']] = daily_df[['open', 'close', 'high', 'low']].fillna(0)
+            daily_df['volume'] = daily_df['volume'].fillna(0)
+            
+            # 计算统计信息（直接在数值列上归约，无需遍历字典列表）
+            summary = self._calculate_summary(daily_df)
+            row_count = len(daily_df)
+            current_price = float(daily_df['close'].iat[-1]) if row_count else 0
+            
+            # 转换为前端需要的格式（按列转换为Python原生类型后组装，避免逐行iterrows）
+            data_list = [
+                {'date': d, 'open': o, 'close': c, 'high': h, 'low': l, 'volume': v}
+                for d, o, c, h, l, v in zip(
+                    _format_daily_dates(daily_df['date']).tolist(),
+                    daily_df['open'].to_numpy(dtype='float64').tolist(),
+                    daily_df['close'].to_numpy(dtype='float64').tolist(),
+                    daily_df['high'].to_numpy(dtype='float64').tolist(),
+                    daily_df['low'].to_numpy(dtype='float64').tolist(),
+                    daily_df['volume'].to_numpy(dtype='float64').astype('int64').tolist()
+                )
+            ]
             
             # 获取显示名称
-            if symbol_type == 'index' and symbol in INDEX_CODE_MAPPING:
-                display_name = INDEX_CODE_MAPPING[symbol]['name']
-            else:
+            display_name = _INDEX_NAMES.get(symbol) if symbol_type == 'index' else None
+            if display_name is None:
                 display_name = f"股票_{symbol}"
             
             return {
@@ -971,15 +1654,119 @@ class FinancialDataService:
                 'code': symbol,
                 'name': display_name,
                 'type': symbol_type,
-                'currentPrice': data_list[-1]['close'] if data_list else 0,
+                'currentPrice': current_price,
                 'data': data_list,
                 'summary': summary,
-                'dataCount': len(data_list),
-                'lastUpdate': datetime.now().isoformat()
-            }
+                'dataCount': row_count,
+                'lastUpdate': _now_iso()
+            }, daily_df
             
         except Exception as e:
-            return self._create_empty_response(symbol, symbol_type, f"数据处理错误：{str(e)}")
+            return self._create_empty_response(symbol, symbol_type, f"数据处理错误：{str(e)}"), None
+    
+    def _resample_ohlcv(self, daily_df: pd.DataFrame, rule: str) -> pd.DataFrame:
+        """
+        将按日期排序的日K数据聚合为周K/月K
+        
+        按整数周期编号分组，用NumPy的reduceat一次扫描完成聚合，
+        周K以周日为标签日期，月K以月末为标签日期（与resample一致）。
+        没有交易日的周期不会产生空K线。
+        
+        Args:
+            daily_df: 包含date/open/close/high/low/volume列的日K数据
+            rule: 'W'（周）或'M'（月）
+            
+        Returns:
+            聚合后的DataFrame
+        """
+        if daily_df.empty:
+            return pd.DataFrame({
+                'date': pd.Series(dtype='datetime64[ns]'),
+                **{col: pd.Series(dtype='float64') for col in ['open', 'close', 'high', 'low', 'volume']}
+            })
+        
+        days = daily_df['date'].to_numpy(dtype='datetime64[D]')
+        if rule == 'W':
+            # 1970-01-01为周四，偏移3天后按7天整除即为周一至周日的周编号
+            codes = (days.view('i8') + 3) // 7
+        else:
+            codes = days.astype('datetime64[M]').view('i8')
+        
+        # 计算每个周期的起止位置
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)] - 1
+        
+        group_codes = codes[starts]
+        if rule == 'W':
+            labels = (group_codes * 7 + 3).astype('datetime64[D]')
+        else:
+            labels = (group_codes + 1).astype('datetime64[M]').astype('datetime64[D]') - np.timedelta64(1, 'D')
+        
+        opens = daily_df['open'].to_numpy(dtype='float64')
+        closes = daily_df['close'].to_numpy(dtype='float64')
+        highs = daily_df['high'].to_numpy(dtype='float64')
+        lows = daily_df['low'].to_numpy(dtype='float64')
+        volumes = daily_df['volume'].to_numpy(dtype='float64')
+        
+        return pd.DataFrame({
+            'date': labels.astype('datetime64[ns]'),
+            'open': opens[starts],
+            'close': closes[ends],
+            'high': np.fmax.reduceat(highs, starts),
+            'low': np.fmin.reduceat(lows, starts),
+            'volume': np.add.reduceat(volumes, starts)
+        })
+    
+    def _calculate_summary(self, df: pd.DataFrame) -> Dict:
+        """
+        基于DataFrame列计算K线统计信息
+        
+        Args:
+            df: 包含close/high/low/volume数值列的DataFrame
+            
+        Returns:
+            统计信息字典
+        """
+        if df.empty:
+            return {
+                'changePercent': 0,
+                'maxPrice': 0,
+                'minPrice': 0,
+                'avgVolume': 0
+            }
+        
+        close = df['close'].to_numpy(dtype='float64')
+        high = df['high'].to_numpy(dtype='float64')
+        low = df['low'].to_numpy(dtype='float64')
+        volume = df['volume'].to_numpy(dtype='float64')
+        
+        # 安装numba且数据超过约一年时，用JIT编译的单次遍历完成全部归约
+        # （数据较少时导入numba、加载/编译内核的开销大于收益）
+        kernel = _get_summary_kernel() if len(df) >= SUMMARY_JIT_MIN_ROWS else None
+        if kernel is not None:
+            first_price, last_price, max_price, min_price, total_volume, volume_count = kernel(
+                close, high, low, volume
+            )
+            # 与NumPy路径一致：只按非NaN的成交量求平均
+            avg_volume = total_volume / volume_count if volume_count else 0
+        else:
+            # 直接在NumPy数组上归约，不经过pandas的索引对齐和布尔索引
+            first_price = float(close[0])
+            last_price = float(close[-1])
+            max_price = float(np.fmax.reduce(high))  # fmax忽略NaN
+            low_positive = low[low > 0]
+            min_price = float(low_positive.min()) if low_positive.size else 0
+            valid_volume = volume[~np.isnan(volume)]
+            avg_volume = valid_volume.mean() if valid_volume.size else 0
+        
+        change_percent = ((last_price - first_price) / first_price * 100) if first_price != 0 else 0
+        
+        return {
+            'changePercent': round(change_percent, 2),
+            'maxPrice': round(max_price, 2),
+            'minPrice': round(min_price, 2),
+            'avgVolume': int(avg_volume)
+        }
     
     def _create_empty_response(self, symbol: str, symbol_type: str, message: str) -> Dict:
         """创建空数据响应"""
@@ -998,7 +1785,7 @@ class FinancialDataService:
             },
             'error': message,
             'dataCount': 0,
-            'lastUpdate': datetime.now().isoformat()
+            'lastUpdate': _now_iso()
         }
     
     def get_stock_data(self, symbol: str, start_date: str, end_date: str) -> Dict:
@@ -1013,6 +1800,12 @@ class FinancialDataService:
         Returns:
             标准化的股票数据字典
         """
+        return self._get_stock_daily(symbol, start_date, end_date)[0]
+    
+    def _get_stock_daily(self, symbol: str, start_date: str, end_date: str) -> Tuple[Dict, Optional[pd.DataFrame]]:
+        """
+        获取股票历史数据，同时返回标准化后的日K DataFrame（命中缓存时为None）
+        """
         try:
             # 验证日期范围
             start_date, end_date = self._validate_date_range(start_date, end_date)
@@ -1020,32 +1813,46 @@ class FinancialDataService:
             # 检查缓存
             cached_data = self.cache.get(symbol, start_date, end_date, 'stock')
             if cached_data:
-                return cached_data
+                return cached_data, None
+            
+            # 最近窗口内的请求（看板默认的近30天）从本地日K存储截取，存储一小时内无需网络请求。
+            # 结果不再写入DataCache：两层各自一小时的有效期叠加会让今日K线最长旧两小时，
+            # 由存储按CACHE_EXPIRE_HOURS刷新今日K线即可保证与直接请求相同的时效
+            date_strs = _today_strs()
+            if (self.daily_store.available and end_date == date_strs['today'] and
+                    start_date >= date_strs['recent_start']):
+                recent_df = self._get_stock_daily_from_store(symbol, date_strs['recent_start'], end_date)
+                if recent_df is not None:
+                    recent_df = _slice_date_range(recent_df, pd.Timestamp(start_date), pd.Timestamp(end_date))
+                    return self._normalize_with_frame(recent_df, symbol, 'stock')
             
-            print(f"正在获取股票数据: {symbol}, 日期范围: {start_date} 到 {end_date}", file=sys.stderr)
+            logger.debug("正在获取股票数据: %s, 日期范围: %s 到 %s", symbol, start_date, end_date)
             
             # 使用akshare获取股票数据
-            df = ak.stock_zh_a_hist(
-                symbol=symbol,
-                period="daily",
-                start_date=start_date.replace('-', ''),
-                end_date=end_date.replace('-', ''),
-                adjust=""
+            df = self._singleflight(
+                ('stock_zh_a_hist', symbol, start_date, end_date),
+                lambda: ak.stock_zh_a_hist(
+                    symbol=symbol,
+                    period="daily",
+                    start_date=start_date.replace('-', ''),
+                    end_date=end_date.replace('-', ''),
+                    adjust=""
+                )
             )
             
             # 标准化数据格式
-            result = self._normalize_data_format(df, symbol, 'stock')
+            result, daily_df = self._normalize_with_frame(df, symbol, 'stock')
             
             # 缓存成功的数据
             if result['success']:
                 self.cache.set(symbol, start_date, end_date, 'stock', result)
             
-            return result
+            return result, daily_df
             
         except Exception as e:
             error_msg = f"获取股票数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
-            return self._create_empty_response(symbol, 'stock', error_msg)
+            logger.error(error_msg)
+            return self._create_empty_response(symbol, 'stock', error_msg), None
     
     def get_index_data(self, symbol: str, start_date: str, end_date: str) -> Dict:
         """
@@ -1059,50 +1866,61 @@ class FinancialDataService:
         Returns:
             标准化的指数数据字典
         """
+        return self._get_index_daily(symbol, start_date, end_date)[0]
+    
+    def _get_index_daily(self, symbol: str, start_date: str, end_date: str) -> Tuple[Dict, Optional[pd.DataFrame]]:
+        """
+        获取指数历史数据，同时返回标准化后的日K DataFrame（命中缓存时为None）
+        """
         try:
             # 验证日期范围
             start_date, end_date = self._validate_date_range(start_date, end_date)
             
-            # 检查缓存（缩短缓存时间以获取更新的数据）
+            # 包含今天时，历史部分单独获取并缓存，今日K线由实时行情补充
+            if end_date == _today_strs()['today']:
+                return self._get_index_daily_with_today(symbol, start_date, end_date)
+            
+            # 检查缓存
             cached_data = self.cache.get(symbol, start_date, end_date, 'index')
             if cached_data:
-                # 如果是今天的数据，不使用缓存，获取最新数据
-                today = datetime.now().strftime('%Y-%m-%d')
-                if end_date == today:
-                    print(f"今日指数数据，跳过缓存: {symbol}", file=sys.stderr)
-                else:
-                    return cached_data
+                return cached_data, None
             
             # 检查是否为支持的指数
             if symbol not in INDEX_CODE_MAPPING:
-                return self._create_empty_response(symbol, 'index', f"不支持的指数代码：{symbol}")
+                return self._create_empty_response(symbol, 'index', f"不支持的指数代码：{symbol}"), None
             
             ak_symbol = INDEX_CODE_MAPPING[symbol]['ak_symbol']
-            print(f"正在获取指数数据: {symbol} ({ak_symbol}), 日期范围: {start_date} 到 {end_date}", file=sys.stderr)
+            logger.debug("正在获取指数数据: %s (%s), 日期范围: %s 到 %s", symbol, ak_symbol, start_date, end_date)
             
             # 获取指数历史数据
             df = None
             try:
                 # 尝试使用不同的API获取指数数据
-                df = ak.stock_zh_index_daily(symbol=ak_symbol)
-                print(f"使用stock_zh_index_daily成功获取数据", file=sys.stderr)
+                df = self._singleflight(
+                    ('stock_zh_index_daily', ak_symbol),
+                    lambda: ak.stock_zh_index_daily(symbol=ak_symbol)
+                )
+                logger.debug("使用stock_zh_index_daily成功获取数据")
             except Exception as e:
-                print(f"获取指数历史数据失败，尝试备用方法: {e}", file=sys.stderr)
+                logger.warning("获取指数历史数据失败，尝试备用方法: %s", e)
                 try:
                     # 备用方法：使用index_zh_a_hist
-                    df = ak.index_zh_a_hist(
-                        symbol=ak_symbol, 
-                        period="daily", 
-                        start_date=start_date.replace('-', ''), 
-                        end_date=end_date.replace('-', '')
+                    df = self._singleflight(
+                        ('index_zh_a_hist', ak_symbol, start_date, end_date),
+                        lambda: ak.index_zh_a_hist(
+                            symbol=ak_symbol, 
+                            period="daily", 
+                            start_date=start_date.replace('-', ''), 
+                            end_date=end_date.replace('-', '')
+                        )
                     )
-                    print(f"使用index_zh_a_hist成功获取数据", file=sys.stderr)
+                    logger.debug("使用index_zh_a_hist成功获取数据")
                 except Exception as e2:
-                    print(f"备用方法也失败: {e2}", file=sys.stderr)
-                    return self._create_empty_response(symbol, 'index', f"获取指数数据失败：{str(e2)}")
+                    logger.warning("备用方法也失败: %s", e2)
+                    return self._create_empty_response(symbol, 'index', f"获取指数数据失败：{str(e2)}"), None
             
             if df is None or df.empty:
-                return self._create_empty_response(symbol, 'index', "获取到的指数数据为空")
+                return self._create_empty_response(symbol, 'index', "获取到的指数数据为空"), None
             
             # 处理日期列
             # 检查是否有date列，如果没有则使用索引作为日期
@@ -1117,60 +1935,230 @@ class FinancialDataService:
                     if date_cols:
                         df.rename(columns={date_cols[0]: 'date'}, inplace=True)
                     else:
-                        return self._create_empty_response(symbol, 'index', "无法找到日期列")
+                        return self._create_empty_response(symbol, 'index', "无法找到日期列"), None
             
-            df['date'] = pd.to_datetime(df['date'])
-            start_dt = pd.to_datetime(start_date)
-            end_dt = pd.to_datetime(end_date)
-            df = df[(df['date'] >= start_dt) & (df['date'] <= end_dt)]
-            
-            # 检查是否需要补充今日数据
-            today = datetime.now().strftime('%Y-%m-%d')
-            today_dt = pd.to_datetime(today)
-            
-            # 如果查询范围包含今天，且今天是工作日，尝试获取今日实时数据
-            if (end_dt >= today_dt and 
-                datetime.now().weekday() < 5 and  # 工作日
-                (df.empty or df['date'].max() < today_dt)):  # 没有今日数据
-                
-                print(f"尝试获取今日指数实时数据: {symbol}", file=sys.stderr)
-                realtime_data = self.get_index_realtime_data(symbol)
-                
-                if realtime_data and realtime_data.get('success'):
-                    # 将实时数据添加到历史数据中
-                    today_row = {
-                        'date': today_dt,
-                        'open': realtime_data.get('open', realtime_data.get('current', 0)),
-                        'close': realtime_data.get('current', 0),
-                        'high': realtime_data.get('high', realtime_data.get('current', 0)),
-                        'low': realtime_data.get('low', realtime_data.get('current', 0)),
-                        'volume': realtime_data.get('volume', 0)
-                    }
-                    
-                    # 创建今日数据的DataFrame
-                    today_df = pd.DataFrame([today_row])
-                    
-                    # 合并数据
-                    if not df.empty:
-                        df = pd.concat([df, today_df], ignore_index=True)
-                    else:
-                        df = today_df
-                    
-                    print(f"成功添加今日指数数据: {symbol}", file=sys.stderr)
+            df['date'] = _parse_daily_dates(df['date'])
+            start_dt = pd.Timestamp(start_date)
+            end_dt = pd.Timestamp(end_date)
+            if not df['date'].is_monotonic_increasing:
+                df = df.sort_values('date', kind='stable')
+            df = _slice_date_range(df, start_dt, end_dt)
             
             # 标准化数据格式
-            result = self._normalize_data_format(df, symbol, 'index')
+            result, daily_df = self._normalize_with_frame(df, symbol, 'index')
             
-            # 只缓存非今日的数据
-            if result['success'] and end_date != today:
+            # 缓存成功的数据（结束日期早于今天，数据不会再变化）
+            if result['success']:
                 self.cache.set(symbol, start_date, end_date, 'index', result)
             
-            return result
+            return result, daily_df
             
         except Exception as e:
             error_msg = f"获取指数数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
-            return self._create_empty_response(symbol, 'index', error_msg)
+            logger.error(error_msg)
+            return self._create_empty_response(symbol, 'index', error_msg), None
+    
+    def _get_index_daily_with_today(self, symbol: str, start_date: str, end_date: str) -> Tuple[Dict, Optional[pd.DataFrame]]:
+        """
+        获取截至今天的指数数据
+        
+        截至昨天的历史部分通过_get_index_daily获取（走缓存），工作日再用实时行情
+        追加今日K线并增量更新统计信息，盘中刷新时无需重新标准化整段历史。
+        
+        Args:
+            symbol: 指数代码
+            start_date: 开始日期（已校验）
+            end_date: 结束日期（已校验，即今天）
+            
+        Returns:
+            (标准化的指数数据字典, None)，周K/月K需要时由字典重建DataFrame
+        """
+        date_strs = _today_strs()
+        if start_date < end_date:
+            history, history_df = self._get_index_daily(symbol, start_date, date_strs['yesterday'])
+            if not history.get('success') and history.get('error') != _NO_DATA_ERROR:
+                # 历史部分获取失败时返回该错误，不能只用今日K线作为成功结果
+                return history, history_df
+        else:
+            history, history_df = self._create_empty_response(symbol, 'index', _NO_DATA_ERROR), None
+        
+        if date_strs['day'].weekday() >= 5:  # 周末没有今日K线
+            return history, history_df
+        
+        logger.debug("尝试获取今日指数实时数据: %s", symbol)
+        realtime_data = self.get_index_realtime_data(symbol)
+        if not realtime_data.get('success'):
+            return history, history_df
+        
+        current = realtime_data.get('current', 0)
+        today_bar = {
+            'date': date_strs['today'],
+            'open': float(realtime_data.get('open', current)),
+            'close': float(current),
+            'high': float(realtime_data.get('high', current)),
+            'low': float(realtime_data.get('low', current)),
+            'volume': int(realtime_data.get('volume', 0))
+        }
+        logger.debug("成功添加今日指数数据: %s", symbol)
+        return self._append_today_bar(history, today_bar, symbol), None
+    
+    def _append_today_bar(self, history: Dict, today_bar: Dict, symbol: str) -> Dict:
+        """
+        在已标准化的历史数据后追加今日K线，统计信息按增量方式更新
+        
+        历史字典可能来自缓存，这里只构造新字典和新列表，不修改原对象。
+        
+        Args:
+            history: 截至昨天的标准化数据字典（获取失败时为空响应）
+            today_bar: 今日K线字典
+            symbol: 指数代码
+            
+        Returns:
+            包含今日K线的标准化数据字典
+        """
+        data_list = history['data'] if history.get('success') else []
+        count = len(data_list)
+        
+        if count:
+            prev_summary = history['summary']
+            first_price = data_list[0]['close']
+            max_price = max(prev_summary['maxPrice'], today_bar['high'])
+            min_price = min((p for p in (prev_summary['minPrice'], today_bar['low']) if p > 0), default=0)
+            avg_volume = (prev_summary['avgVolume'] * count + today_bar['volume']) / (count + 1)
+        else:
+            first_price = today_bar['close']
+            max_price = today_bar['high']
+            min_price = today_bar['low'] if today_bar['low'] > 0 else 0
+            avg_volume = today_bar['volume']
+        
+        last_price = today_bar['close']
+        change_percent = ((last_price - first_price) / first_price * 100) if first_price != 0 else 0
+        
+        return {
+            'success': True,
+            'code': symbol,
+            'name': _INDEX_NAMES.get(symbol, f"指数_{symbol}"),
+            'type': 'index',
+            'currentPrice': last_price,
+            'data': data_list + [today_bar],
+            'summary': {
+                'changePercent': round(change_percent, 2),
+                'maxPrice': round(max_price, 2),
+                'minPrice': round(min_price, 2),
+                'avgVolume': int(avg_volume)
+            },
+            'dataCount': count + 1,
+            'lastUpdate': _now_iso()
+        }
+    
+    def _get_stock_daily_from_store(self, symbol: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        从本地日K存储获取股票数据，必要时增量补充
+        
+        按元数据中记录的已获取区间判断是否覆盖请求（而不是第一根K线的日期，
+        开始日期可能是非交易日或早于上市日）。开始日期早于已获取区间时重新获取完整区间；
+        结束日期晚于已获取区间，或请求截至今天且超过CACHE_EXPIRE_HOURS未检查时，
+        只从最后一个交易日起补充到今天（最后一根K线可能是盘中数据，需要一并刷新）。
+        
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期（已校验）
+            end_date: 结束日期（已校验）
+            
+        Returns:
+            区间内的日K DataFrame，无法获取时返回None
+        """
+        try:
+            stored_df, meta = self.daily_store.load(symbol)
+            today = _today_strs()['today']
+            
+            fetch_start = None
+            if stored_df is None or start_date < meta['start']:
+                stored_df = None
+                fetch_start = start_date
+                covered_start = start_date
+            else:
+                covered_start = meta['start']
+                expired = time.time() - meta['checked'] > CACHE_EXPIRE_HOURS * 3600
+                if end_date > meta['end'] or (end_date == today and expired):
+                    fetch_start = stored_df['date'].iloc[-1].strftime('%Y-%m-%d')
+            
+            if fetch_start is not None:
+                logger.debug("正在补充本地日K数据: %s, 日期范围: %s 到 %s", symbol, fetch_start, today)
+                df = self._singleflight(
+                    ('stock_zh_a_hist', symbol, fetch_start, today),
+                    lambda: ak.stock_zh_a_hist(
+                        symbol=symbol,
+                        period="daily",
+                        start_date=fetch_start.replace('-', ''),
+                        end_date=today.replace('-', ''),
+                        adjust=""
+                    )
+                )
+                _, new_df = self._normalize_with_frame(df, symbol, 'stock')
+                
+                if new_df is not None and not new_df.empty:
+                    if stored_df is not None:
+                        stored_df = pd.concat(
+                            [stored_df[stored_df['date'] < new_df['date'].iloc[0]], new_df],
+                            ignore_index=True
+                        )
+                    else:
+                        stored_df = new_df.reset_index(drop=True)
+                    self.daily_store.save(symbol, stored_df, covered_start, today)
+                elif stored_df is not None:
+                    # 没有新的交易日数据（如节假日、停牌），同样记录为已检查
+                    self.daily_store.save_meta(symbol, covered_start, today)
+                else:
+                    return None
+            
+            return _slice_date_range(stored_df, pd.Timestamp(start_date), pd.Timestamp(end_date))
+            
+        except Exception as e:
+            logger.warning("本地日K存储不可用: %s", e)
+            return None
+    
+    def _get_daily_df(self, symbol: str, start_date: str, end_date: str) -> Tuple[Dict, Optional[pd.DataFrame]]:
+        """
+        获取日K数据及其DataFrame形式，供周K/月K聚合使用
+        
+        Args:
+            symbol: 股票/指数代码
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            (日K数据字典, 按日期排序的日K DataFrame)，获取失败时DataFrame为None
+        """
+        symbol_type = self._identify_symbol_type(symbol)
+        
+        if symbol_type == 'stock' and self.daily_store.available:
+            # 优先使用本地日K存储，只向akshare请求缺失的部分
+            start_date, end_date = self._validate_date_range(start_date, end_date)
+            daily_df = self._get_stock_daily_from_store(symbol, start_date, end_date)
+            if daily_df is not None:
+                if daily_df.empty:
+                    return self._create_empty_response(symbol, 'stock', _NO_DATA_ERROR), None
+                return {
+                    'success': True,
+                    'code': symbol,
+                    'name': f"股票_{symbol}",
+                    'type': 'stock'
+                }, daily_df
+        
+        if symbol_type == 'stock':
+            daily_data, daily_df = self._get_stock_daily(symbol, start_date, end_date)
+        elif symbol_type == 'index':
+            daily_data, daily_df = self._get_index_daily(symbol, start_date, end_date)
+        else:
+            return self._create_empty_response(symbol, 'unknown', f"无法识别的代码格式：{symbol}"), None
+        
+        if daily_df is None and daily_data.get('success', False):
+            # 命中缓存时只有字典数据，需要重建DataFrame
+            daily_df = pd.DataFrame(daily_data['data'])
+            daily_df['date'] = pd.to_datetime(daily_df['date'], format='%Y-%m-%d', cache=True)
+        
+        return daily_data, daily_df
     
     def get_financial_data(self, symbol: str, start_date: str, end_date: str) -> Dict:
         """
@@ -1193,36 +2181,232 @@ class FinancialDataService:
             return self.get_index_data(symbol, start_date, end_date)
         else:
             return self._create_empty_response(symbol, 'unknown', f"无法识别的代码格式：{symbol}")
+    
+    def get_financial_data_batch(self, symbols: List[str], start_date: str, end_date: str) -> Dict:
+        """
+        批量获取金融数据
+        
+        各代码的数据并发获取（最多KLINE_BATCH_WORKERS个并发），总耗时约为最慢的单次请求。
+        
+        Args:
+            symbols: 股票/指数代码列表
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            批量数据字典，data为{代码: 标准化的金融数据字典}
+        """
+        symbols = list(dict.fromkeys(symbols))  # 去重并保持顺序
+        results = {}
+        
+        if symbols:
+            logger.debug("正在批量获取金融数据: %s", ', '.join(symbols))
+            max_workers = min(KLINE_BATCH_WORKERS, len(symbols))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                fetched = executor.map(
+                    lambda symbol: self.get_financial_data(symbol, start_date, end_date),
+                    symbols
+                )
+                results = dict(zip(symbols, fetched))
+        
+        return {
+            'success': True,
+            'data': results,
+            'count': len(symbols),
+            'lastUpdate': _now_iso()
+        }
+
+
+def _to_columnar(result: Dict) -> Dict:
+    """
+    将结果中的行式data（字典列表）转换为列式（每个字段一个列表）
+    
+    Args:
+        result: 标准化的数据字典
+        
+    Returns:
+        data为{字段: 值列表}的新字典，并带有dataFormat='columnar'标记
+    """
+    rows = result.get('data')
+    if not isinstance(rows, list):
+        return result
+    
+    fields = ['date', 'open', 'close', 'high', 'low', 'volume']
+    columns = {field: [row[field] for row in rows] for field in fields}
+    return {**result, 'data': columns, 'dataFormat': 'columnar'}
+
+
+def _write_json_output(result: Dict):
+    """
+    将结果以紧凑JSON写到标准输出（优先使用orjson，不做缩进）
+    
+    orjson一次生成bytes后直接写出，不再拼接换行符产生副本；未安装orjson时
+    用json.dump边编码边写出，避免先在内存中构造完整的JSON字符串。
+    """
+    out = sys.stdout.buffer
+    if orjson is not None:
+        out.write(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS))
+    else:
+        writer = codecs.getwriter('utf-8')(out)
+        json.dump(result, writer, ensure_ascii=False, separators=(',', ':'))
+    out.write(b'\n')
+    out.flush()
+
+
+def _write_json_stream(result: Dict):
+    """
+    流式写出结果：先写除data外的字段，再逐行编码data中的每条记录
+    
+    不会一次性生成包含全部行的JSON字节串，输出缓冲区只需容纳单行数据；
+    data不是列表（如列式、批量结果）时退回到_write_json_output。
+    """
+    rows = result.get('data')
+    if not isinstance(rows, list):
+        _write_json_output(result)
+        return
+    
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        dumps = lambda obj: orjson.dumps(obj, option=option)
+    else:
+        dumps = lambda obj: json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    
+    out = sys.stdout.buffer
+    head = dumps({key: value for key, value in result.items() if key != 'data'})[:-1]
+    out.write(head)
+    out.write(b',"data":[' if len(head) > 1 else b'"data":[')
+    for i, row in enumerate(rows):
+        if i:
+            out.write(b',')
+        out.write(dumps(row))
+    out.write(b']}\n')
+    out.flush()
+
+
+def _handle_request(service: FinancialDataService, action: str, symbol: str, start_date: str,
+                    end_date: str, period: str = 'daily', data_format: str = 'rows') -> Dict:
+    """
+    执行一次数据请求（命令行和--server模式共用）
+    
+    Args:
+        service: 数据服务实例
+        action: 操作类型
+        symbol: 股票/指数代码（批量操作时为逗号分隔的多个代码）
+        start_date: 开始日期
+        end_date: 结束日期
+        period: K线周期
+        data_format: data输出格式（'rows'或'columnar'）
+        
+    Returns:
+        结果字典
+    """
+    # 根据操作类型调用相应的服务
+    if action == 'stock':
+        result = service.get_financial_data(symbol, start_date, end_date)
+    elif action == 'stock_batch':
+        symbols = [code.strip() for code in symbol.split(',') if code.strip()]
+        result = service.get_financial_data_batch(symbols, start_date, end_date)
+    elif action == 'kline':
+        result = service.get_kline_data(symbol, period, start_date, end_date)
+    elif action == 'kline_batch':
+        symbols = [code.strip() for code in symbol.split(',') if code.strip()]
+        result = service.get_kline_data_batch(symbols, period, start_date, end_date)
+    elif action == 'realtime_batch':
+        # 实时行情不需要日期参数，也没有K线data可转为列式
+        symbols = [code.strip() for code in symbol.split(',') if code.strip()]
+        return service.get_realtime_batch(symbols)
+    else:
+        return {
+            'success': False,
+            'error': f'不支持的操作类型: {action}'
+        }
+    
+    # 列式输出：每个字段一个扁平列表，体积更小、序列化更快
+    if data_format == 'columnar':
+        if action in ('stock_batch', 'kline_batch'):
+            result = {**result, 'data': {code: _to_columnar(item) for code, item in result['data'].items()}}
+        else:
+            result = _to_columnar(result)
+    
+    return result
+
+
+def _serve_forever(service: FinancialDataService):
+    """
+    常驻模式：从stdin逐行读取JSON请求，逐行输出JSON结果
+    
+    请求字段与命令行参数一致（action/symbol/start_date/end_date/period/format），
+    可选的id字段会原样带回结果中。进程内缓存和连接在请求之间保持复用。
+    """
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request = {}
+        try:
+            request = _decode_json(line)
+            result = _handle_request(
+                service,
+                request.get('action', 'stock'),
+                request.get('symbol', ''),
+                request.get('start_date', ''),
+                request.get('end_date', ''),
+                request.get('period') or 'daily',
+                request.get('format', 'rows')
+            )
+        except Exception as e:
+            result = {'success': False, 'error': f'请求处理失败：{str(e)}'}
+        if isinstance(request, dict) and 'id' in request:
+            result = {**result, 'id': request['id']}
+        _write_json_output(result)
 
 
 def main():
     """命令行入口函数"""
     parser = argparse.ArgumentParser(description='获取金融数据')
-    parser.add_argument('action', choices=['stock', 'kline'], default='stock', nargs='?', 
-                       help='操作类型：stock(股票数据), kline(K线数据)')
-    parser.add_argument('symbol', help='股票/指数代码')
-    parser.add_argument('start_date', help='开始日期 (YYYY-MM-DD)')
-    parser.add_argument('end_date', help='结束日期 (YYYY-MM-DD)')
+    parser.add_argument('action', choices=['stock', 'stock_batch', 'kline', 'kline_batch', 'realtime_batch'], default='stock', nargs='?', 
+                       help='操作类型：stock(股票数据), stock_batch(批量股票数据), kline(K线数据), kline_batch(批量K线数据), '
+                            'realtime_batch(批量股票实时行情)')
+    parser.add_argument('symbol', nargs='?', help='股票/指数代码（stock_batch、kline_batch和realtime_batch时为逗号分隔的多个代码）')
+    parser.add_argument('start_date', nargs='?', help='开始日期 (YYYY-MM-DD)')
+    parser.add_argument('end_date', nargs='?', help='结束日期 (YYYY-MM-DD)')
     parser.add_argument('period', nargs='?', default='daily', help='K线周期')
+    parser.add_argument('--format', dest='data_format', choices=['rows', 'columnar'], default='rows',
+                       help='data输出格式：rows(字典列表), columnar(按字段的列表)')
+    parser.add_argument('--stream', action='store_true',
+                       help='逐行流式输出data（仅行式输出有效）')
+    parser.add_argument('--server', action='store_true',
+                       help='常驻模式：从stdin逐行读取JSON请求，复用同一个服务实例')
     
     args = parser.parse_args()
+    if not args.server:
+        if args.symbol is None:
+            parser.error('需要提供 symbol 参数')
+        if args.action != 'realtime_batch' and (args.start_date is None or args.end_date is None):
+            parser.error('需要提供 symbol、start_date 和 end_date 参数')
+    
+    # 诊断日志输出到stderr，默认INFO级别（debug消息不做格式化）
+    logging.basicConfig(
+        level=os.environ.get('DATA_SERVICE_LOG_LEVEL', 'INFO').upper(),
+        format='%(message)s',
+        stream=sys.stderr
+    )
     
     # 创建数据服务实例
     service = FinancialDataService()
     
-    # 根据操作类型调用相应的服务
-    if args.action == 'stock':
-        result = service.get_financial_data(args.symbol, args.start_date, args.end_date)
-    elif args.action == 'kline':
-        result = service.get_kline_data(args.symbol, args.period, args.start_date, args.end_date)
-    else:
-        result = {
-            'success': False,
-            'error': f'不支持的操作类型: {args.action}'
-        }
+    if args.server:
+        _serve_forever(service)
+        return
+    
+    result = _handle_request(service, args.action, args.symbol, args.start_date, args.end_date,
+                             args.period, args.data_format)
     
     # 输出JSON结果
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.stream:
+        _write_json_stream(result)
+    else:
+        _write_json_output(result)
 
 
 if __name__ == "__main__":
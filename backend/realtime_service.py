@@ -15,13 +15,27 @@
 """
 
 import sys
+import os
 import json
 import argparse
+import logging
 import akshare as ak
 import pandas as pd
 from datetime import datetime
-import time
-from typing import Dict, List, Optional
+from typing import Dict, Optional
+
+from data_service import (
+    TTLCache, MORNING_START, MORNING_END, AFTERNOON_START, AFTERNOON_END,
+    _build_tick_list, _decode_json, _fetch_realtime_quote, _index_spot_df, _install_http_session,
+    _now_str, _spot_row
+)
+
+try:
+    import orjson  # 可选依赖：更快的JSON序列化
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
 
 # 指数代码映射
 # 此处需要使用akshare指数实时数据API的正确代码格式
@@ -39,9 +53,9 @@ class RealtimeDataService:
     
     def __init__(self):
         """初始化实时数据服务"""
-        self.cache = {}
+        _install_http_session()
         self.cache_duration = 60  # 缓存1分钟
-        self.last_update = {}
+        self.cache = TTLCache(maxsize=256, ttl=self.cache_duration)  # 带过期时间的LRU缓存
     
     def get_index_realtime_data(self, symbol: str) -> Dict:
         """
@@ -55,13 +69,10 @@ class RealtimeDataService:
         """
         try:
             # 检查缓存是否有效
-            current_time = time.time()
             cache_key = f"index_realtime_{symbol}"
-            
-            if (cache_key in self.cache and 
-                cache_key in self.last_update and
-                current_time - self.last_update[cache_key] < self.cache_duration):
-                return self.cache[cache_key]
+            cached_result = self.cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
             
             # 检查是否为支持的指数
             if symbol not in INDEX_CODE_MAPPING:
@@ -69,39 +80,47 @@ class RealtimeDataService:
                     'success': False,
                     'code': symbol,
                     'error': f'不支持的指数代码: {symbol}',
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'update_time': _now_str()
                 }
             
             ak_symbol = INDEX_CODE_MAPPING[symbol]['ak_symbol']
-            print(f"正在获取指数实时数据: {symbol} ({ak_symbol})", file=sys.stderr)
+            logger.debug("正在获取指数实时数据: %s (%s)", symbol, ak_symbol)
             
             # 获取指数实时数据 - 使用正确的API
             # 尝试使用不同API获取指数实时数据
             index_data = None
             try:
-                # 方法1：使用stock_zh_index_spot_em
-                index_data = ak.stock_zh_index_spot_em()
-                # 筛选特定指数
-                index_data = index_data[index_data['代码'] == ak_symbol]
+                # 方法1：使用stock_zh_index_spot_em，先查只有几十行的沪深重要指数表
+                # （与大盘数据共用快照），不在其中时再按交易所获取对应的系列指数表
+                index_data = self._get_spot_snapshot(
+                    'index_spot_important',
+                    lambda: ak.stock_zh_index_spot_em(symbol="沪深重要指数")
+                )
+                if ak_symbol not in index_data.index:
+                    series = "上证系列指数" if symbol.endswith('.SH') else "深证系列指数"
+                    index_data = self._get_spot_snapshot(
+                        f'index_spot_{series}',
+                        lambda: ak.stock_zh_index_spot_em(symbol=series)
+                    )
             except Exception as e1:
-                print(f"方法1失败: {e1}", file=sys.stderr)
+                logger.warning("方法1失败: %s", e1)
                 try:
                     # 方法2：使用index_zh_a_spot_em
-                    index_data = ak.index_zh_a_spot_em()
-                    index_data = index_data[index_data['代码'] == ak_symbol]
+                    index_data = self._get_spot_snapshot('index_zh_a_spot_em', ak.index_zh_a_spot_em)
                 except Exception as e2:
-                    print(f"方法2失败: {e2}", file=sys.stderr)
+                    logger.warning("方法2失败: %s", e2)
                     try:
                         # 方法3：直接使用指数代码
                         index_data = ak.tool_trade_date_hist_sina()
                         # 如果上面都失败，返回默认数据
                         raise Exception("所有API都失败")
                     except Exception as e3:
-                        print(f"方法3失败: {e3}", file=sys.stderr)
+                        logger.warning("方法3失败: %s", e3)
                         raise Exception(f"无法获取指数数据: {e1}")
             
-            if not index_data.empty:
-                row = index_data.iloc[0]
+            # 按代码直接查找快照中的行情
+            row = _spot_row(index_data, ak_symbol)
+            if row is not None:
                 result = {
                     'success': True,
                     'code': symbol,
@@ -113,15 +132,14 @@ class RealtimeDataService:
                     'low': float(row['最低']) if '最低' in row else 0,
                     'open': float(row['今开']) if '今开' in row else 0,
                     'yesterday_close': float(row['昨收']) if '昨收' in row else 0,
-                    'volume': int(row['成交量']) if '成交量' in row and pd.notna(row['成交量']) else 0,
-                    'turnover': float(row['成交额']) if '成交额' in row and pd.notna(row['成交额']) else 0,
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'volume': int(row['成交量']) if '成交量' in row else 0,
+                    'turnover': float(row['成交额']) if '成交额' in row else 0,
+                    'update_time': _now_str(),
                     'market_status': self._get_market_status()
                 }
                 
                 # 更新缓存
                 self.cache[cache_key] = result
-                self.last_update[cache_key] = current_time
                 
                 return result
             else:
@@ -129,21 +147,26 @@ class RealtimeDataService:
                     'success': False,
                     'code': symbol,
                     'error': '未找到该指数的实时数据',
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'update_time': _now_str()
                 }
                 
         except Exception as e:
             error_msg = f"获取指数实时数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return {
                 'success': False,
                 'code': symbol,
                 'error': error_msg,
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'update_time': _now_str()
             }
+    
+    def get_realtime_data(self, symbol: str) -> Dict:
         """
         获取股票实时数据
         
+        优先请求个股行情接口，只下载该股票的数据；个股接口失败时
+        回退到全市场快照（在cache_duration内复用，多个代码共享一次请求）。
+        
         Args:
             symbol: 股票代码
             
@@ -152,24 +175,25 @@ class RealtimeDataService:
         """
         try:
             # 检查缓存是否有效
-            current_time = time.time()
             cache_key = f"realtime_{symbol}"
+            cached_result = self.cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
             
-            if (cache_key in self.cache and 
-                cache_key in self.last_update and
-                current_time - self.last_update[cache_key] < self.cache_duration):
-                return self.cache[cache_key]
+            logger.debug("正在获取实时数据: %s", symbol)
             
-            print(f"正在获取实时数据: {symbol}", file=sys.stderr)
-            
-            # 获取实时行情数据
-            realtime_data = ak.stock_zh_a_spot_em()
-            
-            # 筛选特定股票
-            stock_data = realtime_data[realtime_data['代码'] == symbol]
-            
-            if not stock_data.empty:
-                row = stock_data.iloc[0]
+            result = _fetch_realtime_quote(symbol, self._get_market_status)
+            if result is None:
+                # 个股接口失败，回退到全市场快照
+                realtime_data = self._get_spot_snapshot('stock_spot_em', ak.stock_zh_a_spot_em)
+                row = _spot_row(realtime_data, symbol)
+                if row is None:
+                    return {
+                        'success': False,
+                        'code': symbol,
+                        'error': '未找到该股票的实时数据',
+                        'update_time': _now_str()
+                    }
                 result = {
                     'success': True,
                     'code': symbol,
@@ -177,37 +201,29 @@ class RealtimeDataService:
                     'current_price': float(row['最新价']),
                     'change_percent': float(row['涨跌幅']),
                     'change_amount': float(row['涨跌额']),
-                    'volume': int(row['成交量']) if pd.notna(row['成交量']) else 0,
-                    'turnover': float(row['成交额']) if pd.notna(row['成交额']) else 0,
+                    'volume': int(row['成交量']),
+                    'turnover': float(row['成交额']),
                     'high': float(row['最高']),
                     'low': float(row['最低']),
                     'open': float(row['今开']),
                     'yesterday_close': float(row['昨收']),
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'update_time': _now_str(),
                     'market_status': self._get_market_status()
                 }
-                
-                # 更新缓存
-                self.cache[cache_key] = result
-                self.last_update[cache_key] = current_time
-                
-                return result
-            else:
-                return {
-                    'success': False,
-                    'code': symbol,
-                    'error': '未找到该股票的实时数据',
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
+            
+            # 更新缓存
+            self.cache[cache_key] = result
+            
+            return result
                 
         except Exception as e:
             error_msg = f"获取实时数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return {
                 'success': False,
                 'code': symbol,
                 'error': error_msg,
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'update_time': _now_str()
             }
     
     def get_realtime_tick_data(self, symbol: str, count: int = 50) -> Dict:
@@ -222,7 +238,7 @@ class RealtimeDataService:
             分时数据字典
         """
         try:
-            print(f"正在获取分时数据: {symbol}", file=sys.stderr)
+            logger.debug("正在获取分时数据: %s", symbol)
             
             # 获取分时数据 - 使用不同的API
             try:
@@ -233,20 +249,14 @@ class RealtimeDataService:
                     # 获取最新的count条数据
                     recent_data = tick_data.tail(count)
                     
-                    tick_list = []
-                    for _, row in recent_data.iterrows():
-                        tick_list.append({
-                            'time': row.name.strftime('%H:%M') if hasattr(row.name, 'strftime') else str(row.name),
-                            'price': float(row['close']) if pd.notna(row['close']) else 0,
-                            'volume': int(row['volume']) if pd.notna(row['volume']) else 0
-                        })
+                    tick_list = _build_tick_list(recent_data)
                     
                     return {
                         'success': True,
                         'code': symbol,
                         'data': tick_list,
                         'count': len(tick_list),
-                        'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        'update_time': _now_str()
                     }
                 else:
                     return {
@@ -254,7 +264,7 @@ class RealtimeDataService:
                         'code': symbol,
                         'error': '暂无分时数据',
                         'data': [],
-                        'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        'update_time': _now_str()
                     }
                     
             except Exception:
@@ -264,18 +274,18 @@ class RealtimeDataService:
                     'code': symbol,
                     'error': '分时数据暂不可用',
                     'data': [],
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'update_time': _now_str()
                 }
                 
         except Exception as e:
             error_msg = f"获取分时数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return {
                 'success': False,
                 'code': symbol,
                 'error': error_msg,
                 'data': [],
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'update_time': _now_str()
             }
     
     def get_market_realtime(self) -> Dict:
@@ -287,59 +297,80 @@ class RealtimeDataService:
         """
         try:
             # 检查缓存
-            current_time = time.time()
             cache_key = "market_realtime"
+            cached_result = self.cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
             
-            if (cache_key in self.cache and 
-                cache_key in self.last_update and
-                current_time - self.last_update[cache_key] < self.cache_duration):
-                return self.cache[cache_key]
-            
-            print("正在获取大盘实时数据", file=sys.stderr)
+            logger.debug("正在获取大盘实时数据")
             
-            # 获取主要指数实时数据
+            # 获取主要指数实时数据（一次请求获取全部重要指数行情，再按代码查找）
             indices = ['sh000001', 'sz399001', 'sz399006']  # 上证、深证、创业板
             market_data = []
             
-            for index_code in indices:
-                try:
-                    index_data = ak.stock_zh_index_spot_em(symbol=index_code)
-                    if not index_data.empty:
-                        row = index_data.iloc[0]
-                        market_data.append({
-                            'code': index_code,
-                            'name': row['名称'] if '名称' in row else index_code,
-                            'current': float(row['最新价']) if '最新价' in row else 0,
-                            'change_percent': float(row['涨跌幅']) if '涨跌幅' in row else 0,
-                            'change_amount': float(row['涨跌额']) if '涨跌额' in row else 0
-                        })
-                except Exception as e:
-                    print(f"获取指数{index_code}数据失败: {e}", file=sys.stderr)
-                    continue
+            try:
+                snapshot = self._get_spot_snapshot(
+                    'index_spot_important',
+                    lambda: ak.stock_zh_index_spot_em(symbol="沪深重要指数")
+                )
+                for index_code in indices:
+                    row = _spot_row(snapshot, index_code[2:])
+                    if row is None:
+                        logger.warning("获取指数%s数据失败: 行情数据中不存在该指数", index_code)
+                        continue
+                    market_data.append({
+                        'code': index_code,
+                        'name': row['名称'] if '名称' in row else index_code,
+                        'current': float(row['最新价']) if '最新价' in row else 0,
+                        'change_percent': float(row['涨跌幅']) if '涨跌幅' in row else 0,
+                        'change_amount': float(row['涨跌额']) if '涨跌额' in row else 0
+                    })
+            except Exception as e:
+                logger.warning("获取指数行情数据失败: %s", e)
             
             result = {
                 'success': True,
                 'data': market_data,
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'update_time': _now_str(),
                 'market_status': self._get_market_status()
             }
             
             # 更新缓存
             self.cache[cache_key] = result
-            self.last_update[cache_key] = current_time
             
             return result
             
         except Exception as e:
             error_msg = f"获取大盘数据失败：{str(e)}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             return {
                 'success': False,
                 'error': error_msg,
                 'data': [],
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'update_time': _now_str()
             }
     
+    def _get_spot_snapshot(self, name: str, fetcher) -> pd.DataFrame:
+        """
+        获取按代码索引的行情快照，在cache_duration内复用
+        
+        只缓存建好索引、转换过数值列的DataFrame，查找时用_spot_row只为所需的一行构造字典
+        （全A股快照约5000行，整表转为字典会产生十万个Python对象）。
+        
+        Args:
+            name: 快照名称，用于区分不同的行情表
+            fetcher: 无参数的akshare行情获取函数
+            
+        Returns:
+            以代码为索引的行情DataFrame
+        """
+        cache_key = f"spot_{name}"
+        snapshot = self.cache.get(cache_key)
+        if snapshot is None:
+            snapshot = _index_spot_df(fetcher())
+            self.cache[cache_key] = snapshot
+        return snapshot
+    
     def _get_market_status(self) -> str:
         """
         获取市场状态
@@ -356,65 +387,117 @@ class RealtimeDataService:
             return 'closed'
         
         # 交易时间判断
-        morning_start = datetime.strptime('09:30', '%H:%M').time()
-        morning_end = datetime.strptime('11:30', '%H:%M').time()
-        afternoon_start = datetime.strptime('13:00', '%H:%M').time()
-        afternoon_end = datetime.strptime('15:00', '%H:%M').time()
-        
-        if ((morning_start <= current_time <= morning_end) or 
-            (afternoon_start <= current_time <= afternoon_end)):
+        if ((MORNING_START <= current_time <= MORNING_END) or 
+            (AFTERNOON_START <= current_time <= AFTERNOON_END)):
             return 'trading'
         else:
             return 'closed'
 
 
-def main():
-    """命令行入口函数"""
-    parser = argparse.ArgumentParser(description='获取实时金融数据')
-    parser.add_argument('method', choices=['realtime', 'tick', 'market', 'index_realtime'], 
-                       help='数据类型：realtime(实时行情), tick(分时数据), market(大盘数据), index_realtime(指数实时数据)')
-    parser.add_argument('symbol', nargs='?', help='股票/指数代码（realtime、tick和index_realtime需要）')
-    
-    args = parser.parse_args()
-    
-    # 创建实时数据服务实例
-    service = RealtimeDataService()
+def _write_json_output(result: Dict):
+    """将结果以紧凑JSON写到标准输出（优先使用orjson，不做缩进）"""
+    out = sys.stdout.buffer
+    if orjson is not None:
+        out.write(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS))
+    else:
+        out.write(json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    out.write(b'\n')
+    out.flush()
+
+
+def _handle_request(service: RealtimeDataService, method: str, symbol: Optional[str]) -> Dict:
+    """
+    执行一次实时数据请求（命令行和--server模式共用）
     
-    # 根据方法调用相应的服务
-    if args.method == 'realtime':
-        if not args.symbol:
-            result = {
+    Args:
+        service: 实时数据服务实例
+        method: 数据类型
+        symbol: 股票/指数代码（market方法不需要）
+        
+    Returns:
+        结果字典
+    """
+    if method == 'realtime':
+        if not symbol:
+            return {
                 'success': False,
                 'error': 'realtime方法需要提供股票代码'
             }
-        else:
-            result = service.get_realtime_data(args.symbol)
-    elif args.method == 'index_realtime':
-        if not args.symbol:
-            result = {
+        return service.get_realtime_data(symbol)
+    elif method == 'index_realtime':
+        if not symbol:
+            return {
                 'success': False,
                 'error': 'index_realtime方法需要提供指数代码'
             }
-        else:
-            result = service.get_index_realtime_data(args.symbol)
-    elif args.method == 'tick':
-        if not args.symbol:
-            result = {
+        return service.get_index_realtime_data(symbol)
+    elif method == 'tick':
+        if not symbol:
+            return {
                 'success': False,
                 'error': 'tick方法需要提供股票代码'
             }
-        else:
-            result = service.get_realtime_tick_data(args.symbol)
-    elif args.method == 'market':
-        result = service.get_market_realtime()
+        return service.get_realtime_tick_data(symbol)
+    elif method == 'market':
+        return service.get_market_realtime()
     else:
-        result = {
+        return {
             'success': False,
-            'error': f'不支持的方法: {args.method}'
+            'error': f'不支持的方法: {method}'
         }
+
+
+def _serve_forever(service: RealtimeDataService):
+    """
+    常驻模式：从stdin逐行读取JSON请求（method/symbol，可选id），逐行输出JSON结果
+    """
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request = {}
+        try:
+            request = _decode_json(line)
+            result = _handle_request(service, request.get('method', ''), request.get('symbol'))
+        except Exception as e:
+            result = {'success': False, 'error': f'请求处理失败：{str(e)}'}
+        if isinstance(request, dict) and 'id' in request:
+            result = {**result, 'id': request['id']}
+        _write_json_output(result)
+
+
+def main():
+    """命令行入口函数"""
+    parser = argparse.ArgumentParser(description='获取实时金融数据')
+    parser.add_argument('method', nargs='?', choices=['realtime', 'tick', 'market', 'index_realtime'], 
+                       help='数据类型：realtime(实时行情), tick(分时数据), market(大盘数据), index_realtime(指数实时数据)')
+    parser.add_argument('symbol', nargs='?', help='股票/指数代码（realtime、tick和index_realtime需要）')
+    parser.add_argument('--server', action='store_true',
+                       help='常驻模式：从stdin逐行读取JSON请求，复用同一个服务实例')
+    
+    args = parser.parse_args()
+    if not args.server and args.method is None:
+        parser.error('需要提供 method 参数')
+    
+    # 诊断日志输出到stderr，默认INFO级别（debug消息不做格式化），与data_service.py使用同一环境变量
+    logging.basicConfig(
+        level=os.environ.get('DATA_SERVICE_LOG_LEVEL', 'INFO').upper(),
+        format='%(message)s',
+        stream=sys.stderr
+    )
+    
+    # 创建实时数据服务实例
+    service = RealtimeDataService()
+    
+    if args.server:
+        _serve_forever(service)
+        return
+    
+    # 根据方法调用相应的服务
+    result = _handle_request(service, args.method, args.symbol)
     
     # 输出JSON结果
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    _write_json_output(result)
 
 
 if __name__ == "__main__":
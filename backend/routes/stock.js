@@ -63,9 +63,10 @@ function identifySymbolType(code) {
  * @param {string} startDate - 开始日期
  * @param {string} endDate - 结束日期
  * @param {number} timeout - 超时时间（毫秒）
+ * @param {string} dataFormat - data输出格式：'rows'(字典列表) 或 'columnar'(按字段的列表)
  * @returns {Promise<Object>} 数据获取结果
  */
-function callPythonDataService(symbol, startDate, endDate, timeout = 30000) {
+function callPythonDataService(symbol, startDate, endDate, timeout = 30000, dataFormat = 'rows') {
     return new Promise((resolve, reject) => {
         console.log(`调用Python数据服务: ${symbol}, ${startDate} - ${endDate}`);
         
@@ -73,7 +74,11 @@ function callPythonDataService(symbol, startDate, endDate, timeout = 30000) {
         const pythonScript = path.join(__dirname, '..', 'data_service.py');
         
         // 创建Python子进程，传递正确的参数顺序
-        const pythonProcess = spawn('python', [pythonScript, 'stock', symbol, startDate, endDate]);
+        const args = [pythonScript, 'stock', symbol, startDate, endDate];
+        if (dataFormat === 'columnar') {
+            args.push('--format', 'columnar');
+        }
+        const pythonProcess = spawn('python', args);
         
         let stdout = '';
         let stderr = '';
@@ -204,6 +209,7 @@ function isValidDateFormat(dateString) {
  * 获取股票/指数历史数据API - 增强版
  * 
  * GET /api/stock/:code/:startDate/:endDate
+ * 查询参数：format=columnar 时data按字段返回列表（默认为字典列表）
  * 
  * 功能增强：
  * 1. 支持股票代码和指数代码混合查询
@@ -273,7 +279,8 @@ router.get('/:code/:startDate/:endDate', async (req, res) => {
         
         // 调用Python数据服务获取真实数据
         try {
-            const result = await callPythonDataService(code, startDate, endDate);
+            const dataFormat = req.query.format === 'columnar' ? 'columnar' : 'rows';
+            const result = await callPythonDataService(code, startDate, endDate, 30000, dataFormat);
             
             // 添加额外的响应信息
             const response = {
@@ -476,6 +483,119 @@ router.get('/realtime/:code', async (req, res) => {
     }
 });
 
+/**
+ * 调用Python数据服务批量获取多只股票的实时行情
+ * 
+ * @param {string[]} symbols - 股票代码列表
+ * @param {number} timeout - 超时时间（毫秒）
+ * @returns {Promise<Object>} 数据获取结果
+ */
+function callPythonRealtimeBatchService(symbols, timeout = 30000) {
+    return new Promise((resolve, reject) => {
+        console.log(`批量调用Python实时行情服务: ${symbols.join(',')}`);
+        
+        // Python脚本路径
+        const pythonScript = path.join(__dirname, '..', 'data_service.py');
+        
+        // 构造参数（实时行情不需要日期参数）
+        const args = [pythonScript, 'realtime_batch', symbols.join(',')];
+        
+        // 创建Python子进程
+        const pythonProcess = spawn('python', args);
+        
+        let stdout = '';
+        let stderr = '';
+        
+        // 收集标准输出
+        pythonProcess.stdout.on('data', (data) => {
+            stdout += data.toString();
+        });
+        
+        // 收集错误输出
+        pythonProcess.stderr.on('data', (data) => {
+            stderr += data.toString();
+        });
+        
+        // 处理进程结束
+        pythonProcess.on('close', (code) => {
+            if (code === 0) {
+                try {
+                    const result = JSON.parse(stdout);
+                    resolve(result);
+                } catch (parseError) {
+                    console.error('JSON解析错误:', parseError);
+                    reject(new Error(`数据解析失败: ${parseError.message}`));
+                }
+            } else {
+                console.error('Python进程错误:', stderr);
+                reject(new Error(`数据获取失败 (退出码: ${code}): ${stderr}`));
+            }
+        });
+        
+        // 处理进程错误
+        pythonProcess.on('error', (error) => {
+            console.error('Python进程启动错误:', error);
+            reject(new Error(`无法启动Python数据服务: ${error.message}`));
+        });
+        
+        // 设置超时
+        const timer = setTimeout(() => {
+            pythonProcess.kill('SIGTERM');
+            reject(new Error('数据获取超时'));
+        }, timeout);
+        
+        pythonProcess.on('close', () => {
+            clearTimeout(timer);
+        });
+    });
+}
+
+/**
+ * 批量获取股票实时数据API
+ * 
+ * GET /api/stock/realtime-batch?codes=000001,600519
+ * 一次请求获取多只股票的实时行情，由Python端统一查询缓存并并发获取未命中的数据
+ */
+router.get('/realtime-batch', async (req, res) => {
+    try {
+        const { codes } = req.query;
+        
+        // 解析代码列表（只支持股票代码）
+        const symbols = [...new Set((codes || '').split(',').map(code => code.trim()).filter(Boolean))];
+        const invalidSymbols = symbols.filter(code => identifySymbolType(code) !== 'stock');
+        
+        if (symbols.length === 0 || invalidSymbols.length > 0) {
+            return res.status(400).json({
+                success: false,
+                error: '无效的代码格式',
+                message: symbols.length === 0 ? '请通过codes参数提供逗号分隔的股票代码列表' : `无效的股票代码: ${invalidSymbols.join(', ')}`,
+                timestamp: new Date().toISOString()
+            });
+        }
+        
+        console.log(`批量获取实时数据: ${symbols.join(', ')}`);
+        
+        const result = await callPythonRealtimeBatchService(symbols, 30000);
+        
+        res.json({
+            ...result,
+            requestInfo: {
+                requestTime: new Date().toISOString(),
+                dataType: 'realtime_batch'
+            }
+        });
+        
+    } catch (error) {
+        console.error('批量获取实时数据错误:', error);
+        res.status(500).json({
+            success: false,
+            error: '批量实时数据获取失败',
+            message: error.message,
+            timestamp: new Date().toISOString()
+        });
+    }
+});
+
 /**
  * 获取股票分时数据API
  * 
@@ -719,6 +839,148 @@ router.get('/kline/:code/:period', async (req, res) => {
     }
 });
 
+/**
+ * 调用Python K线数据服务批量获取多个代码的K线数据
+ * 
+ * @param {string[]} symbols - 股票/指数代码列表
+ * @param {string} period - K线周期
+ * @param {string} startDate - 开始日期
+ * @param {string} endDate - 结束日期
+ * @param {number} timeout - 超时时间（毫秒）
+ * @returns {Promise<Object>} 数据获取结果
+ */
+function callPythonKlineBatchService(symbols, period, startDate, endDate, timeout = 60000) {
+    return new Promise((resolve, reject) => {
+        console.log(`批量调用Python K线数据服务: ${symbols.join(',')}, 周期: ${period}, ${startDate} - ${endDate}`);
+        
+        // Python脚本路径
+        const pythonScript = path.join(__dirname, '..', 'data_service.py');
+        
+        // 构造参数（顺序与data_service.py的命令行参数一致）
+        const args = [pythonScript, 'kline_batch', symbols.join(','), startDate || '', endDate || '', period];
+        
+        // 创建Python子进程
+        const pythonProcess = spawn('python', args);
+        
+        let stdout = '';
+        let stderr = '';
+        
+        // 收集标准输出
+        pythonProcess.stdout.on('data', (data) => {
+            stdout += data.toString();
+        });
+        
+        // 收集错误输出
+        pythonProcess.stderr.on('data', (data) => {
+            stderr += data.toString();
+        });
+        
+        // 处理进程结束
+        pythonProcess.on('close', (code) => {
+            if (code === 0) {
+                try {
+                    const result = JSON.parse(stdout);
+                    resolve(result);
+                } catch (parseError) {
+                    console.error('JSON解析错误:', parseError);
+                    reject(new Error(`数据解析失败: ${parseError.message}`));
+                }
+            } else {
+                console.error('Python进程错误:', stderr);
+                reject(new Error(`数据获取失败 (退出码: ${code}): ${stderr}`));
+            }
+        });
+        
+        // 处理进程错误
+        pythonProcess.on('error', (error) => {
+            console.error('Python进程启动错误:', error);
+            reject(new Error(`无法启动Python数据服务: ${error.message}`));
+        });
+        
+        // 设置超时
+        const timer = setTimeout(() => {
+            pythonProcess.kill('SIGTERM');
+            reject(new Error('数据获取超时'));
+        }, timeout);
+        
+        pythonProcess.on('close', () => {
+            clearTimeout(timer);
+        });
+    });
+}
+
+/**
+ * 批量获取股票/指数K线数据API
+ * 
+ * GET /api/stock/kline-batch/:period?codes=000001,600519,000001.SH
+ * 一次请求获取多个代码的K线数据，由Python端统一查询缓存并并发获取未命中的数据
+ */
+router.get('/kline-batch/:period', async (req, res) => {
+    try {
+        const { period } = req.params;
+        const { codes, startDate, endDate } = req.query;
+        
+        // 支持的周期类型
+        const supportedPeriods = ['1min', '5min', '15min', '30min', '60min', 'daily', 'weekly', 'monthly'];
+        
+        // 验证周期类型
+        if (!supportedPeriods.includes(period)) {
+            return res.status(400).json({
+                success: false,
+                error: '不支持的周期类型',
+                message: `支持的周期类型: ${supportedPeriods.join(', ')}`,
+                timestamp: new Date().toISOString()
+            });
+        }
+        
+        // 解析代码列表
+        const symbols = [...new Set((codes || '').split(',').map(code => code.trim()).filter(Boolean))];
+        const invalidSymbols = symbols.filter(code => identifySymbolType(code) === 'unknown');
+        
+        if (symbols.length === 0 || invalidSymbols.length > 0) {
+            return res.status(400).json({
+                success: false,
+                error: '无效的代码格式',
+                message: symbols.length === 0 ? '请通过codes参数提供逗号分隔的代码列表' : `无效的代码: ${invalidSymbols.join(', ')}`,
+                timestamp: new Date().toISOString()
+            });
+        }
+        
+        // 如果提供了日期参数，则验证格式
+        if ((startDate && !isValidDateFormat(startDate)) || (endDate && !isValidDateFormat(endDate))) {
+            return res.status(400).json({
+                success: false,
+                error: '日期格式错误',
+                message: '请使用 YYYY-MM-DD 格式',
+                example: '2024-01-01',
+                timestamp: new Date().toISOString()
+            });
+        }
+        
+        console.log(`批量获取${period}周期K线数据: ${symbols.join(', ')}`);
+        
+        const result = await callPythonKlineBatchService(symbols, period, startDate, endDate, 60000);
+        
+        res.json({
+            ...result,
+            requestInfo: {
+                requestTime: new Date().toISOString(),
+                dataType: 'kline_batch',
+                period: period
+            }
+        });
+        
+    } catch (error) {
+        console.error('批量获取K线数据错误:', error);
+        res.status(500).json({
+            success: false,
+            error: '批量K线数据获取失败',
+            message: error.message,
+            timestamp: new Date().toISOString()
+        });
+    }
+});
+
 /**
  * 数据服务状态检查API
  * 